@@ -4,8 +4,10 @@ import heapq
 class Graph:
     def __init__(self):
         self.vertices = {}
+        self.version = 0
 
     def add_vertex(self, name, heuristic):
+        self.version += 1
         self.vertices[name] = {}
         self.vertices[name]['heuristic'] = heuristic
 
@@ -14,20 +16,33 @@ class Graph:
             raise ValueError(f"Vertex {u} not found in the graph.")
         if v not in self.vertices:
             raise ValueError(f"Vertex {v} not found in the graph.")
+        self.version += 1
         self.vertices[u][v] = weight
         self.vertices[v][u] = weight
 
 
-def astar(graph, start, goal):
-    open_set = [(0, start)]  # Priority queue of nodes to be evaluated
+def astar(graph, start, goal, heuristic=None):
+    # heuristic(u, v) estimates the distance from u to v, by default the static 'heuristic' field of u is used
+    if heuristic is None:
+        def estimate(vertex):
+            return graph.vertices[vertex]['heuristic']
+    else:
+        def estimate(vertex):
+            return heuristic(vertex, goal)
+
+    open_set = [(estimate(start), 0, start)]  # Priority queue of (f_score, push counter, node)
     came_from = {}  # Dictionary to store the parent node of each node
-    g_score = {vertex: float('inf') for vertex in graph.vertices}  # Cost from start along best known path
-    g_score[start] = 0
-    f_score = {vertex: float('inf') for vertex in graph.vertices}  # Estimated total cost from start to goal through y
-    f_score[start] = graph.vertices[start]['heuristic']
+    g_score = {start: 0}  # Cost from start along best known path, only for the nodes the search reaches
+    closed_set = set()  # Nodes that were already expanded with their best known g_score
+    pushed = 1
+    expanded = 0
 
     while open_set:
-        _, current = heapq.heappop(open_set)
+        _, _, current = heapq.heappop(open_set)
+
+        # Lazy deletion: an entry for an already expanded node is stale
+        if current in closed_set:
+            continue
 
         if current == goal:
             # Reconstruct the path from goal to start
@@ -36,59 +51,197 @@ def astar(graph, start, goal):
                 current = came_from[current]
                 path.append(current)
             path.reverse()
-            return path
+            return path, g_score[goal], expanded
 
-        for neighbor in graph.vertices[current]:
+        closed_set.add(current)
+        expanded += 1
+
+        for neighbor, weight in graph.vertices[current].items():
             if neighbor == 'heuristic':
                 continue
 
-            tentative_g_score = g_score[current] + graph.vertices[current][neighbor]
+            tentative_g_score = g_score[current] + weight
 
-            if tentative_g_score < g_score[neighbor]:
+            if tentative_g_score < g_score.get(neighbor, float('inf')):
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + graph.vertices[neighbor]['heuristic']
-
-                # Add neighbor to the open set if it's not already there
-                if neighbor not in [node[1] for node in open_set]:
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
-
-    return None  # No path found
-
-
-# Example usage:
-g = Graph()
-g.add_vertex('1', 1)
-g.add_vertex('2', 1)
-g.add_vertex('3', 8)
-g.add_vertex('4', 7)
-g.add_vertex('5', 6)
-g.add_vertex('6', 1)
-g.add_vertex('7', 1)
-g.add_vertex('8', 3)
-g.add_vertex('9', 2)
-g.add_vertex('10', 1)
-
-from laborator1 import read_from_file
-edges = read_from_file("input.txt")
-for edge in edges:
-    g.add_edge(str(edge[0]), str(edge[1]), edge[1])
-# g.add_edge('A', 'B', 1)
-# g.add_edge('A', 'C', 3)
-# g.add_edge('B', 'D', 2)
-# g.add_edge('B', 'E', 4)
-# g.add_edge('C', 'D', 1)
-# g.add_edge('C', 'E', 7)
-# g.add_edge('D', 'F', 5)
-# g.add_edge('E', 'F', 3)
-
-start_node = '1'
-goal_node = '7'
-path = astar(g, start_node, goal_node)
-if path:
-    print(f"Shortest path from {start_node} to {goal_node}: {' -> '.join(path)}")
-else:
-    print(f"No path found from {start_node} to {goal_node}.")
+                # Reopen the node if an inconsistent heuristic closed it too early
+                closed_set.discard(neighbor)
+                heapq.heappush(open_set, (tentative_g_score + estimate(neighbor), pushed, neighbor))
+                pushed += 1
+
+    return None, float('inf'), expanded  # No path found
+
+
+def neighbours_functions(graph):
+    # (forward, backward) functions mapping a vertex to its (neighbour, weight) pairs;
+    # a_star.Graph stores every edge in both directions, laborator1.Graph keeps in_neigh for the reverse search
+    if hasattr(graph, 'get_out_neighbours'):
+        def weight(u, v):
+            edge = graph.edges.get((u, v))
+            return 1 if edge is None or edge[2] is None else edge[2]
+
+        def forward(vertex):
+            return [(neighbor, weight(vertex, neighbor)) for neighbor in graph.get_out_neighbours(vertex)]
+
+        def backward(vertex):
+            return [(neighbor, weight(neighbor, vertex)) for neighbor in graph.get_in_neighbours(vertex)]
+
+        return forward, backward
+
+    def both(vertex):
+        return [(neighbor, weight) for neighbor, weight in graph.vertices[vertex].items() if neighbor != 'heuristic']
+
+    return both, both
+
+
+def bidirectional_astar(graph, start, goal, heuristic=None):
+    # heuristic(u, v) must be a consistent estimate of the distance from u to v; without one this is
+    # bidirectional Dijkstra. Both searches use the average potential p(v) = (h(v, goal) - h(start, v)) / 2,
+    # forward keys are d(v) + p(v) and backward keys d(v) - p(v), so the search can stop as soon as the two
+    # smallest keys add up to the best path found so far.
+    if start == goal:
+        return [start], 0, 0
+
+    def potential(vertex):
+        return 0 if heuristic is None else (heuristic(vertex, goal) - heuristic(start, vertex)) / 2
+
+    neighbours = neighbours_functions(graph)
+    signs = (1, -1)
+    g_score = ({start: 0}, {goal: 0})
+    came_from = ({}, {})
+    closed_set = (set(), set())
+    open_set = ([(potential(start), 0, start)], [(-potential(goal), 1, goal)])
+    pushed = 2
+    expanded = 0
+    best_cost = float('inf')
+    meeting = None
+
+    while True:
+        for side in (0, 1):
+            while open_set[side] and open_set[side][0][2] in closed_set[side]:
+                heapq.heappop(open_set[side])
+
+        if not open_set[0] or not open_set[1] or open_set[0][0][0] + open_set[1][0][0] >= best_cost:
+            break
+
+        # Grow the side with the smaller open set
+        side = 0 if len(open_set[0]) <= len(open_set[1]) else 1
+        _, _, current = heapq.heappop(open_set[side])
+        closed_set[side].add(current)
+        expanded += 1
+
+        for neighbor, weight in neighbours[side](current):
+            tentative_g_score = g_score[side][current] + weight
+            if tentative_g_score < g_score[side].get(neighbor, float('inf')):
+                g_score[side][neighbor] = tentative_g_score
+                came_from[side][neighbor] = current
+                heapq.heappush(open_set[side], (tentative_g_score + signs[side] * potential(neighbor), pushed, neighbor))
+                pushed += 1
+
+                if neighbor in g_score[1 - side] and tentative_g_score + g_score[1 - side][neighbor] < best_cost:
+                    best_cost = tentative_g_score + g_score[1 - side][neighbor]
+                    meeting = neighbor
+
+    if meeting is None:
+        return None, float('inf'), expanded
+
+    # Join the forward path start -> meeting with the backward path meeting -> goal
+    path = [meeting]
+    while path[-1] in came_from[0]:
+        path.append(came_from[0][path[-1]])
+    path.reverse()
+    while path[-1] in came_from[1]:
+        path.append(came_from[1][path[-1]])
+    return path, best_cost, expanded
+
+
+def grid_graph(rows, columns, goal, seed=0):
+    # rows x columns grid with random weights in 1..9 and the Manhattan distance to goal as heuristic
+    import random
+
+    rng = random.Random(seed)
+    g = Graph()
+    for row in range(rows):
+        for column in range(columns):
+            g.add_vertex((row, column), abs(goal[0] - row) + abs(goal[1] - column))
+
+    for row in range(rows):
+        for column in range(columns):
+            if row + 1 < rows:
+                g.add_edge((row, column), (row + 1, column), rng.randint(1, 9))
+            if column + 1 < columns:
+                g.add_edge((row, column), (row, column + 1), rng.randint(1, 9))
+
+    return g
+
+
+if __name__ == "__main__":
+    # Example usage:
+    g = Graph()
+    g.add_vertex('1', 1)
+    g.add_vertex('2', 1)
+    g.add_vertex('3', 8)
+    g.add_vertex('4', 7)
+    g.add_vertex('5', 6)
+    g.add_vertex('6', 1)
+    g.add_vertex('7', 1)
+    g.add_vertex('8', 3)
+    g.add_vertex('9', 2)
+    g.add_vertex('10', 1)
+
+    from laborator1 import read_from_file
+    edges = read_from_file("input.txt")
+    for edge in edges:
+        g.add_edge(str(edge[0]), str(edge[1]), edge[1])
+    # g.add_edge('A', 'B', 1)
+    # g.add_edge('A', 'C', 3)
+    # g.add_edge('B', 'D', 2)
+    # g.add_edge('B', 'E', 4)
+    # g.add_edge('C', 'D', 1)
+    # g.add_edge('C', 'E', 7)
+    # g.add_edge('D', 'F', 5)
+    # g.add_edge('E', 'F', 3)
+
+    start_node = '1'
+    goal_node = '7'
+    path, cost, expanded = astar(g, start_node, goal_node)
+    if path:
+        print(f"Shortest path from {start_node} to {goal_node}: {' -> '.join(path)} (cost {cost}, {expanded} expanded)")
+    else:
+        print(f"No path found from {start_node} to {goal_node}.")
+
+    from timeit import default_timer
+    for size in (50, 100, 200, 400):
+        grid = grid_graph(size, size, (size - 1, size - 1))
+        begin = default_timer()
+        path, cost, expanded = astar(grid, (0, 0), (size - 1, size - 1))
+        print(f"{size}x{size} grid: cost {cost}, {expanded} expanded, {default_timer() - begin:.3f}s")
+
+        def manhattan(u, v):
+            return abs(u[0] - v[0]) + abs(u[1] - v[1])
+
+        begin = default_timer()
+        path, cost, expanded = bidirectional_astar(grid, (0, 0), (size - 1, size - 1), manhattan)
+        print(f"{size}x{size} grid, bidirectional: cost {cost}, {expanded} expanded, {default_timer() - begin:.3f}s")
+
+    # Point to point queries on the Facebook graph with unit weights
+    import random
+
+    facebook = Graph()
+    for edge in read_from_file("facebook_combined.txt"):
+        for vertex in edge[:2]:
+            if vertex not in facebook.vertices:
+                facebook.add_vertex(vertex, 0)
+        facebook.add_edge(edge[0], edge[1], 1)
+
+    rng = random.Random(0)
+    queries = [tuple(rng.sample(sorted(facebook.vertices), 2)) for _ in range(100)]
+    for name, search in (("astar", astar), ("bidirectional_astar", bidirectional_astar)):
+        begin = default_timer()
+        results = [search(facebook, s, t) for s, t in queries]
+        print(f"facebook, {name}: {sum(result[2] for result in results)} expanded over {len(queries)} queries, "
+              f"total cost {sum(result[1] for result in results)}, {default_timer() - begin:.3f}s")
 
 
 """Graph class:
@@ -101,20 +254,28 @@ add_edge(self, u, v, weight): This method adds an edge between two vertices in t
 
 astar function:
 
-This function implements the A* algorithm to find the shortest path from the start node to the goal node in the given graph.
+This function implements the A* algorithm to find the shortest path from the start node to the goal node in the given graph. By default it uses the static 'heuristic' value of every vertex; passing heuristic(u, v), for example a landmarks.Landmarks object with ALT lower bounds, makes it work for any goal.
 
-It initializes the open_set as a priority queue (implemented as a heap) to keep track of nodes to be evaluated. Each node in the queue is represented as a tuple (f_score, node), where f_score is the estimated total cost from start to goal through the given node, and node is the name of the node.
+It initializes the open_set as a priority queue (implemented as a heap) to keep track of nodes to be evaluated. Each entry in the queue is a tuple (f_score, counter, node), where f_score is the estimated total cost from start to goal through the given node, counter is the order in which the entry was pushed (it breaks ties without comparing node names), and node is the name of the node. A node can be in the queue more than once; only its best entry is used (lazy deletion).
 
 The came_from dictionary is used to store the parent node of each node in the shortest path.
 
-The g_score dictionary stores the cost from the start node to each node along the best-known path, initialized with infinity for all nodes except the start node, which is initialized with a cost of 0.
+The g_score dictionary stores the cost from the start node to each node along the best-known path. It starts with only the start node and grows as the search reaches new nodes, so a search that touches a handful of nodes does not pay for the whole graph. A node missing from g_score has an unknown (infinite) cost.
+
+The closed_set holds the nodes that were already expanded. Popping a node that is already in the closed_set means the entry is stale, and it is skipped.
+
+The algorithm starts by popping the entry with the lowest f_score from the open_set. If the current node is the goal node, it reconstructs the shortest path from the goal to the start using the came_from dictionary and returns it together with its cost and the number of expanded nodes.
+
+Otherwise, it adds the current node to the closed_set and iterates through its neighbors. For each neighbor, it calculates the tentative g_score (the cost of the path from the start node to the neighbor through the current node). If the tentative g_score is lower than the known g_score for the neighbor, it updates came_from and g_score, removes the neighbor from the closed_set (an inconsistent heuristic can close a node too early) and pushes a new entry for it.
+
+If the open_set is empty and the goal node has not been reached, the function returns (None, inf, expanded) to indicate that no path was found.
 
-The f_score dictionary stores the estimated total cost from the start node to the goal node through each node, initialized with infinity for all nodes except the start node, which is initialized with the heuristic value of the start node.
+bidirectional_astar function:
 
-The algorithm starts by popping the node with the lowest f_score from the open_set. If the current node is the goal node, it reconstructs the shortest path from the goal to the start using the came_from dictionary and returns it.
+This function answers the same point-to-point query by growing a forward search from the start node and a backward search from the goal node at the same time, always expanding the side with the smaller open set. neighbours_functions gives it the forward and backward neighbours of a vertex: a_star.Graph stores every edge in both directions, and laborator1.Graph keeps in_neigh lists for the backward search.
 
-Otherwise, it iterates through the neighbors of the current node. For each neighbor, it calculates the tentative g_score (the cost of the path from the start node to the neighbor through the current node). If the tentative g_score is lower than the current g_score for the neighbor, it updates the came_from, g_score, and f_score dictionaries for the neighbor and adds the neighbor to the open_set if it's not already there.
+Without a heuristic both searches are plain Dijkstra, and the search stops once the smallest keys of the two open sets add up to at least the cost of the best path found so far. With a consistent heuristic(u, v), both searches use the average potential p(v) = (heuristic(v, goal) - heuristic(start, v)) / 2, forward keys d(v) + p(v) and backward keys d(v) - p(v), so the same stopping rule stays correct. The static 'heuristic' field of the vertices is not used, because it only estimates the distance to one fixed goal.
 
-If the open_set is empty and the goal node has not been reached, the function returns None to indicate that no path was found.
+It returns the path, its cost and the number of expanded nodes, like astar.
 
-The example usage demonstrates how to create a graph, add vertices with their heuristics, add edges between vertices, and then use the astar function to find the shortest path from the start node to the goal node in the graph. If a path is found, it prints the nodes in the shortest path. Otherwise, it informs the user that no path was found."""
\ No newline at end of file
+The example usage demonstrates how to create a graph, add vertices with their heuristics, add edges between vertices, and then use the astar function to find the shortest path from the start node to the goal node in the graph. If a path is found, it prints the nodes in the shortest path, its cost and the number of expanded nodes. Otherwise, it informs the user that no path was found. It then times astar and bidirectional_astar on grid graphs built by grid_graph, which uses the Manhattan distance to the goal as heuristic, and compares the nodes both expand on point-to-point queries over the Facebook graph with unit weights."""
\ No newline at end of file
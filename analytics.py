@@ -0,0 +1,288 @@
+from itertools import chain
+from multiprocessing import cpu_count
+import numpy as np
+from contraction import DisjointSet
+from shared import attached, release, share_arrays
+import executor
+
+
+def arc_arrays(graph):
+    # vertex names and the (src, dst) index arrays of every stored arc of a laborator1 Graph or CSRGraph or a
+    # laborator2 Graph, undirected edges in both directions
+    if hasattr(graph, "indptr"):
+        names = graph.get_vertices()
+        return names, np.repeat(np.arange(len(names), dtype=np.int64), np.diff(graph.indptr)), \
+            graph.indices.astype(np.int64)
+
+    names = list(graph.vertices)
+    first = next(iter(graph.vertices.values()), None)
+    if isinstance(first, dict):
+        # laborator1: the out neighbour sets are the adjacency get_degrees_of_vertex counts
+        counts = np.fromiter((len(vertex["out_neigh"]) for vertex in graph.vertices.values()), np.int64, len(names))
+        src = np.repeat(np.arange(len(names), dtype=np.int64), counts)
+        targets = list(chain.from_iterable(vertex["out_neigh"] for vertex in graph.vertices.values()))
+    else:
+        keys = list(graph.edges)
+        if not graph.directed:
+            keys += [(v, u) for u, v in keys if u != v]
+        src = None
+        targets = [v for _, v in keys]
+
+    labels = np.array(names)
+    if labels.dtype.kind in "iu":
+        # integer labels are mapped with a sorted search instead of a dict lookup per arc
+        order = np.argsort(labels, kind="stable")
+        def lookup(values):
+            return order[np.searchsorted(labels[order], np.array(values, dtype=labels.dtype))]
+    else:
+        index = {name: i for i, name in enumerate(names)}
+        def lookup(values):
+            return np.fromiter((index[value] for value in values), np.int64, len(values))
+
+    if src is None:
+        src = lookup([u for u, _ in keys])
+    return names, src, lookup(targets)
+
+
+def degrees(graph, arcs=None):
+    # (names, in degrees, out degrees), the same numbers get_degrees_of_vertex returns one vertex at a time;
+    # arcs can be passed in when arc_arrays(graph) was already computed
+    names, src, dst = arcs or arc_arrays(graph)
+    return names, np.bincount(dst, minlength=len(names)), np.bincount(src, minlength=len(names))
+
+
+def degree_histogram(degree):
+    # histogram[d] = number of vertices of degree d
+    return np.bincount(degree)
+
+
+def weakly_connected_components(graph, arcs=None):
+    # (names, component of every vertex), components numbered in the order of their first vertex
+    names, src, dst = arcs or arc_arrays(graph)
+    sets = DisjointSet(len(names))
+    sets.union_all(src, dst)
+    return names, np.unique(sets.roots(), return_inverse=True)[1]
+
+
+def component_sizes(components):
+    return np.bincount(components)
+
+
+def _split(load, no_chunks):
+    # [start, end) vertex ranges with about the same total load each
+    cumulative = np.cumsum(load)
+    cuts = np.searchsorted(cumulative, cumulative[-1] * np.arange(1, no_chunks) / no_chunks, side="right") \
+        if len(cumulative) else []
+    bounds = np.unique(np.concatenate(([0], cuts, [len(load)]))).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _pagerank_rows(specs, start, end):
+    # rows start..end of P^T x from the transposed CSR, x already divided by the out degrees
+    shared = attached(specs)
+    in_indptr, in_indices = shared["in_indptr"], shared["in_indices"]
+    sums = np.concatenate(([0], np.cumsum(shared["contribution"][in_indices[in_indptr[start]:in_indptr[end]]])))
+    shared["incoming"][start:end] = sums[in_indptr[start + 1:end + 1] - in_indptr[start]] - \
+        sums[in_indptr[start:end] - in_indptr[start]]
+
+
+def pagerank(graph, alpha=0.85, tol=1e-6, max_iter=100, no_processes=1, arcs=None):
+    # power iteration x = alpha (P^T x + dangling mass / n) + (1 - alpha) / n until the L1 change is below n * tol,
+    # the mat-vec is one bincount, or row ranges of the transposed CSR spread over no_processes workers.
+    # Returns (names, ranks) or raises RuntimeError when max_iter iterations do not converge
+    names, src, dst = arcs or arc_arrays(graph)
+    n = len(names)
+    if n == 0:
+        return names, np.zeros(0)
+    out_degree = np.bincount(src, minlength=n)
+    dangling = out_degree == 0
+    rank = np.full(n, 1 / n)
+
+    specs = None
+    blocks = []
+    try:
+        if no_processes > 1:
+            order = np.argsort(dst, kind="stable")
+            in_indptr = np.concatenate(([0], np.cumsum(np.bincount(dst, minlength=n))))
+            arrays, specs = share_arrays({"in_indptr": in_indptr, "in_indices": src[order],
+                                          "contribution": np.zeros(n), "incoming": np.zeros(n)}, blocks)
+            tasks = [(specs, start, end) for start, end in _split(np.diff(in_indptr) + 1, no_processes)]
+
+        for _ in range(max_iter):
+            contribution = np.divide(rank, out_degree, out=np.zeros(n), where=~dangling)
+            if specs is None:
+                incoming = np.bincount(dst, weights=contribution[src], minlength=n)
+            else:
+                arrays["contribution"][:] = contribution
+                executor.starmap(_pagerank_rows, tasks, no_processes, chunksize=1)
+                incoming = arrays["incoming"].copy()
+
+            previous = rank
+            rank = alpha * (incoming + rank[dangling].sum() / n) + (1 - alpha) / n
+            if np.abs(rank - previous).sum() < n * tol:
+                return names, rank
+
+    finally:
+        release(blocks)
+
+    raise RuntimeError(f"pagerank did not converge in {max_iter} iterations")
+
+
+def simple_edges(n, src, dst):
+    # every undirected edge once as lo < hi, self loops dropped
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    keys = np.unique(lo[lo != hi] * n + hi[lo != hi])
+    return keys // n, keys % n
+
+
+def forward_adjacency(graph, arcs=None):
+    # the simple undirected graph behind graph, every edge kept once from its lower ranked endpoint, ranked by
+    # (degree, id): each vertex then has at most sqrt(2 E) forward neighbours. Returns (names, rank of every
+    # vertex, indptr, indices sorted within rows) over ranks
+    names, src, dst = arcs or arc_arrays(graph)
+    n = len(names)
+    lo, hi = simple_edges(n, src, dst)
+
+    degree = np.bincount(lo, minlength=n) + np.bincount(hi, minlength=n)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+    a, b = rank[lo], rank[hi]
+    tail, head = np.minimum(a, b), np.maximum(a, b)
+    order = np.lexsort((head, tail))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(tail, minlength=n))))
+    return names, rank, indptr, head[order]
+
+
+def _count_triangles(arrays, start, end):
+    # every triangle u < v < w is found once, from the wedge v, w of u's forward row, by looking v -> w up
+    indptr, indices, keys = arrays["indptr"], arrays["indices"], arrays["keys"]
+    n = len(indptr) - 1
+    begin, stop = indptr[start], indptr[end]
+    rows = np.repeat(np.arange(start, end), np.diff(indptr[start:end + 1]))
+    # number of later entries in the same row for every entry of the range
+    later = indptr[rows + 1] - np.arange(begin, stop) - 1
+    first = np.repeat(np.arange(begin, stop), later)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(later) - later, later)
+
+    wedges = indices[first] * n + indices[second]
+    positions = np.minimum(np.searchsorted(keys, wedges), len(keys) - 1)
+    closed = keys[positions] == wedges
+    u = rows[first[closed] - begin]
+    return np.bincount(np.concatenate((u, indices[first[closed]], indices[second[closed]])), minlength=n)
+
+
+def _count_shared_triangles(specs, start, end):
+    return _count_triangles(attached(specs), start, end)
+
+
+def triangles(graph, no_processes=1, arcs=None):
+    # (names, triangles through every vertex) of the simple undirected graph behind graph; the total is sum / 3
+    names, rank, indptr, indices = forward_adjacency(graph, arcs)
+    n = len(names)
+    if n == 0:
+        return names, np.zeros(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    forward = np.diff(indptr)
+    # vertex ranges with the same number of wedges, a few per worker so a slow chunk does not stall the rest
+    tasks = _split(forward * (forward - 1) // 2 + 1, 4 * no_processes)
+
+    blocks = []
+    try:
+        arrays = {"indptr": indptr, "indices": indices, "keys": rows * n + indices}
+        if no_processes > 1:
+            _, specs = share_arrays(arrays, blocks)
+            counts = sum(executor.imap(_count_shared_triangles, [(specs, start, end) for start, end in tasks],
+                                       no_processes, chunksize=1, star=True))
+        else:
+            counts = sum(_count_triangles(arrays, start, end) for start, end in tasks)
+
+    finally:
+        release(blocks)
+
+    return names, counts[rank]
+
+
+def clustering(graph, no_processes=1, arcs=None):
+    # (names, local clustering coefficient of every vertex, average clustering)
+    names, src, dst = arcs = arcs or arc_arrays(graph)
+    _, counts = triangles(graph, no_processes, arcs)
+    lo, hi = simple_edges(len(names), src, dst)
+    degree = np.bincount(lo, minlength=len(names)) + np.bincount(hi, minlength=len(names))
+    coefficients = np.divide(2 * counts, degree * (degree - 1), out=np.zeros(len(names)), where=degree > 1)
+    return names, coefficients, float(coefficients.mean()) if len(names) else 0.0
+
+
+if __name__ == "__main__":
+    from timeit import default_timer
+    from collections import Counter, deque
+    import networkx as nx
+    from laborator1 import CSRGraph, Graph, read_from_file
+
+    def looped(graph):
+        in_degree = [graph.get_degrees_of_vertex(vertex)[0] for vertex in graph.get_vertices()]
+        out_degree = [graph.get_degrees_of_vertex(vertex)[1] for vertex in graph.get_vertices()]
+        histogram = Counter(i + o for i, o in zip(in_degree, out_degree))
+
+        component = {}
+        for start in graph.get_vertices():
+            if start in component:
+                continue
+            component[start] = len(component)
+            queue = deque([start])
+            label = component[start]
+            while queue:
+                in_neigh, out_neigh = graph.get_neighbours_of_vertex(queue.popleft())
+                for node in in_neigh + out_neigh:
+                    if node not in component:
+                        component[node] = label
+                        queue.append(node)
+        return in_degree, out_degree, histogram, component
+
+    def vectorized(graph):
+        arcs = arc_arrays(graph)
+        names, in_degree, out_degree = degrees(graph, arcs)
+        histogram = degree_histogram(in_degree + out_degree)
+        return in_degree, out_degree, histogram, weakly_connected_components(graph, arcs)[1]
+
+    # facebook without its ten biggest hubs has many weak components, plus a sparse random graph 25x its size
+    facebook = Graph(read_from_file('facebook_combined.txt'), directed=True, weighted=False)
+    for vertex in [0, 107, 348, 414, 686, 698, 1684, 1912, 3437, 3980]:
+        facebook.delete_vertex(vertex)
+    rng = np.random.default_rng(0)
+    src, dst = rng.integers(0, 100000, 1000000), rng.integers(0, 100000, 1000000)
+    random_graph = Graph([[u, v, None] for u, v in zip(src.tolist(), dst.tolist())], directed=True, weighted=False)
+
+    for label, graph in (("facebook", facebook), ("random 100k/1M", random_graph)):
+        for backend in (graph, CSRGraph(graph=graph)):
+            timings = []
+            for function in (looped, vectorized):
+                begin = default_timer()
+                function(backend)
+                timings.append(default_timer() - begin)
+            print(f"{label}, {type(backend).__name__}: Graph API loop {timings[0]:.3f}s, "
+                  f"vectorized {timings[1]:.3f}s")
+
+            _, in_degree, out_degree = degrees(backend)
+            assert in_degree.tolist() == [backend.get_degrees_of_vertex(v)[0] for v in backend.get_vertices()]
+            assert out_degree.tolist() == [backend.get_degrees_of_vertex(v)[1] for v in backend.get_vertices()]
+
+    names, components = weakly_connected_components(facebook)
+    reference = nx.DiGraph([edge[:2] for edge in facebook.get_edges()])
+    reference.add_nodes_from(names)
+    print(f"facebook: {len(component_sizes(components))} weak components (networkx: "
+          f"{nx.number_weakly_connected_components(reference)}), largest {component_sizes(components).max()}")
+    print(f"facebook degree histogram head: {degree_histogram(sum(degrees(facebook)[1:]))[:10].tolist()}")
+
+    # pagerank and triangle counting on the whole undirected facebook graph against the number of workers
+    facebook = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    arcs = arc_arrays(facebook)
+    for no_processes in sorted({1, 2, 4, cpu_count()}):
+        begin = default_timer()
+        _, ranks = pagerank(facebook, no_processes=no_processes, arcs=arcs)
+        pagerank_time = default_timer() - begin
+        begin = default_timer()
+        _, counts = triangles(facebook, no_processes=no_processes, arcs=arcs)
+        triangles_time = default_timer() - begin
+        print(f"{no_processes} workers: pagerank {pagerank_time:.3f}s (top vertex {arcs[0][int(ranks.argmax())]}), "
+              f"triangles {triangles_time:.3f}s ({counts.sum() // 3} triangles)")
+    print(f"facebook average clustering: {clustering(facebook, arcs=arcs)[2]:.4f}")
@@ -0,0 +1,226 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import tracemalloc
+from multiprocessing import cpu_count
+from time import perf_counter
+import numpy as np
+import a_star
+import generators
+import laborator1
+import laborator2
+import pa_star
+from laborator1 import CSRGraph, bfs, dfs, parallel_bfs, pbfs, poolbfs, read_from_file
+
+# a regression is a median and 10th percentile both more than THRESHOLD above the baseline's, by more than
+# NOISE seconds, or a peak more than THRESHOLD and MEMORY_NOISE bytes above it: one slow run on a busy machine
+# moves the median of a few repeats, not the fast end of them too
+THRESHOLD = 0.10
+NOISE = 0.001
+MEMORY_NOISE = 1 << 16
+# options that change what a benchmark measures; a baseline recorded with other values is not comparable
+COMPARABLE = ("vertices", "edges", "generator", "mutations", "processes", "seed", "repeats", "warmup")
+
+
+def measure(function, setup=None, repeats=5, warmup=1):
+    # function(state) timed over repeats runs after warmup untimed ones; setup() makes the state of every run
+    # outside the timing, so mutations start from an unmodified graph. The peak is traced in one more run,
+    # tracemalloc slows the timed ones down too much, and only counts this process, not pool workers
+    times = []
+    for run in range(warmup + repeats):
+        state = setup() if setup else None
+        gc.collect()
+        begin = perf_counter()
+        function(state)
+        if run >= warmup:
+            times.append(perf_counter() - begin)
+
+    state = setup() if setup else None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times = np.array(times)
+    return {"median": float(np.median(times)), "p10": float(np.percentile(times, 10)),
+            "p90": float(np.percentile(times, 90)), "min": float(times.min()), "max": float(times.max()),
+            "repeats": len(times), "peak_bytes": int(peak)}
+
+
+def astar_graphs(edges):
+    # the undirected a_star.Graph and pa_star.Graph of edges, heuristic 0 so both searches are Dijkstra's
+    graphs = (a_star.Graph(), pa_star.Graph())
+    for graph in graphs:
+        for u, v, _ in edges:
+            for vertex in (u, v):
+                if vertex not in graph.vertices:
+                    graph.add_vertex(vertex, 0)
+        for u, v, w in edges:
+            if u != v:
+                graph.add_edge(u, v, 1 if w is None else w)
+    return graphs
+
+
+def dataset_benchmarks(name, options):
+    # (benchmark, function, setup, repeats) of every benchmark on the edge list file name
+    repeats = options.repeats
+    edges = read_from_file(name)
+    graph = laborator1.Graph(edges, directed=True, weighted=True)
+    csr = CSRGraph(graph=graph)
+    start = edges[0][0]
+    goal = bfs(graph, start)[-1]
+    search, parallel_search = astar_graphs(edges)
+
+    rng = random.Random(options.seed)
+    vertices = list(graph.get_vertices())
+    count = min(options.mutations, len(edges))
+    existing = [edge[:2] for edge in rng.sample(edges, count)]
+    added = [(rng.choice(vertices), rng.choice(vertices), 1) for _ in range(count)]
+    victims = rng.sample(vertices, min(count, len(vertices)))
+    cache = name + ".npz"
+
+    def drop_cache():
+        if os.path.exists(cache):
+            os.remove(cache)
+
+    def graph1():
+        return laborator1.Graph(edges, directed=True, weighted=True)
+
+    def graph2():
+        return laborator2.Graph(edges, directed=False, weighted=True)
+
+    def each(method, arguments):
+        def run(target):
+            for argument in arguments:
+                getattr(target, method)(*argument)
+        return run
+
+    def contract(target):
+        # contract_edge fails on an edge an earlier contraction already merged away, and on self loops, which
+        # R-MAT graphs have
+        for u, v in existing:
+            if u != v and (u, v) in target.edges:
+                target.contract_edge([u, v])
+
+    yield "read_from_file (parse)", lambda _: read_from_file(name), drop_cache, repeats
+    yield "read_from_file (cached)", lambda _: read_from_file(name), None, repeats
+    yield "laborator1.Graph", lambda _: laborator1.Graph(edges, directed=True, weighted=True), None, repeats
+    yield "laborator2.Graph", lambda _: laborator2.Graph(edges, directed=False, weighted=True), None, repeats
+    yield "CSRGraph", lambda _: CSRGraph(edges, directed=True, weighted=True), None, repeats
+
+    yield "bfs", lambda _: bfs(graph, start), None, repeats
+    yield "dfs", lambda _: dfs(graph, start), None, repeats
+    yield "pbfs", lambda _: pbfs(graph, True, True, start), None, repeats
+    yield "poolbfs", lambda _: poolbfs(graph, True, True, start), None, repeats
+    yield "parallel_bfs (csr)", lambda _: parallel_bfs(csr, start), None, repeats
+    yield "laborator2.Graph.bfs", lambda target: target.bfs(start), graph2, repeats
+
+    yield "a_star.astar", lambda _: a_star.astar(search, start, goal), None, repeats
+    # a process group per call, a handful of runs is plenty
+    yield "pa_star.astar", lambda _: pa_star.astar(parallel_search, start, goal, options.processes), None, \
+        min(repeats, 3)
+
+    yield f"laborator1 add_edge x{count}", each("add_edge", added), graph1, repeats
+    yield f"laborator1 delete_edge x{count}", each("delete_edge", [(edge,) for edge in existing]), graph1, repeats
+    yield f"laborator1 delete_vertex x{len(victims)}", each("delete_vertex", [(v,) for v in victims]), graph1, repeats
+    yield f"laborator1 contract_edge x{count}", contract, graph1, repeats
+    yield f"laborator1 apply_edges x{2 * count}", \
+        lambda target: target.apply_edges([("delete", *edge) for edge in existing] +
+                                          [("add", *edge) for edge in added]), graph1, repeats
+    yield f"laborator2 add_edge x{count}", each("add_edge", added), graph2, repeats
+    yield f"laborator2 delete_edge x{count}", each("delete_edge", [(edge,) for edge in existing]), graph2, repeats
+    yield f"laborator2 delete_vertex x{len(victims)}", each("delete_vertex", [(v,) for v in victims]), graph2, repeats
+    yield f"laborator2 contract_edge x{count}", contract, graph2, repeats
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # (key, what, baseline value, value) of every regression against the baseline's results
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if result["median"] > old["median"] * (1 + threshold) and result["p10"] > old["p10"] * (1 + threshold) \
+                and result["median"] - old["median"] > NOISE:
+            regressions.append((key, "median", old["median"], result["median"]))
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold) and \
+                result["peak_bytes"] - old["peak_bytes"] > MEMORY_NOISE:
+            regressions.append((key, "peak_bytes", old["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the graph backends and algorithms.")
+    parser.add_argument("--datasets", nargs="+", default=["input", "facebook", "generated"],
+                        help="input, facebook, generated or paths of edge list files")
+    parser.add_argument("--only", default=None, help="run only the benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--vertices", type=int, default=10000, help="vertices of the generated graph")
+    parser.add_argument("--edges", type=int, default=50000, help="edges of the generated graph")
+    parser.add_argument("--generator", default="erdos_renyi", help="rmat, erdos_renyi, barabasi_albert or grid")
+    parser.add_argument("--mutations", type=int, default=100, help="calls per mutation benchmark")
+    parser.add_argument("--processes", type=int, default=None, help="workers of pa_star.astar")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    options = parser.parse_args(arguments)
+
+    files = {"input": "input.txt", "facebook": "facebook_combined.txt"}
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for dataset in options.datasets:
+            if dataset == "generated":
+                name = os.path.join(directory, f"{options.generator}_{options.vertices}_{options.edges}.txt")
+                generators.write_edges(name, generators.generate(options.generator, options.vertices, options.edges,
+                                                                 (1, 9), options.seed))
+            else:
+                name = files.get(dataset, dataset)
+
+            for benchmark, function, setup, repeats in dataset_benchmarks(name, options):
+                if options.only and options.only not in benchmark:
+                    continue
+                result = measure(function, setup, repeats, options.warmup)
+                results[f"{dataset}/{benchmark}"] = result
+                print(f"{dataset:>10} {benchmark:<32} median {1e3 * result['median']:10.3f} ms  "
+                      f"p10 {1e3 * result['p10']:10.3f}  p90 {1e3 * result['p90']:10.3f}  "
+                      f"peak {result['peak_bytes'] / 2 ** 20:8.2f} MiB", flush=True)
+
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                       "platform": platform.platform(), "cpu_count": cpu_count(), "options": vars(options)},
+              "results": results}
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        recorded = baseline["meta"]["options"]
+        mismatched = [name for name in COMPARABLE if name in recorded and recorded[name] != vars(options)[name]]
+        if mismatched:
+            print(f"{options.baseline} was recorded with other options, not comparing: " +
+                  ", ".join(f"{name} {recorded[name]} != {vars(options)[name]}" for name in mismatched))
+            return 2
+
+        regressions = compare(results, baseline["results"], options.threshold)
+        for key, what, old, new in regressions:
+            change = f"{new / old - 1:+.0%}" if old else "from 0"
+            print(f"REGRESSION {key}: {what} {old:.6g} -> {new:.6g} ({change})")
+        if regressions:
+            return 1
+        print("no regressions against", options.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+from multiprocessing import cpu_count
+import numpy as np
+from shared import attached, release, share_arrays
+import executor
+
+
+def edge_arrays(graph):
+    # vertex names and the (src, dst, weight) arrays of the undirected multigraph behind a laborator1 Graph or
+    # CSRGraph or a laborator2 Graph; both stored directions of an undirected edge count once, missing weights as 1
+    if hasattr(graph, "indptr"):
+        names = graph.get_vertices()
+        src = np.repeat(np.arange(len(names), dtype=np.int64), np.diff(graph.indptr))
+        dst = graph.indices.astype(np.int64)
+        weights = np.ones(len(dst)) if graph.weights is None else np.where(np.isnan(graph.weights), 1, graph.weights)
+
+    else:
+        names = list(graph.vertices)
+        index = {name: i for i, name in enumerate(names)}
+        src = np.fromiter((index[u] for u, _ in graph.edges), np.int64, len(graph.edges))
+        dst = np.fromiter((index[v] for _, v in graph.edges), np.int64, len(graph.edges))
+        # laborator1 stores [u, v, weight] records, laborator2 only the weight
+        weights = np.fromiter((1 if w is None else w for w in
+                               (value[2] if isinstance(value, list) else value for value in graph.edges.values())),
+                              np.float64, len(graph.edges))
+
+    if not graph.directed:
+        lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+        _, first = np.unique(lo * len(names) + hi, return_index=True)
+        first.sort()
+        src, dst, weights = lo[first], hi[first], weights[first]
+
+    return names, src, dst, weights
+
+
+def compress(parent):
+    # pointer jumping until every entry points straight at its root
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+class DisjointSet:
+
+    def __init__(self, n):
+        # the root of every set is its smallest member, so representatives do not depend on the union order
+        self.parent = np.arange(n, dtype=np.int64)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return int(i)
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+        return a != b
+
+    def union_all(self, a, b):
+        # merges every pair (a[i], b[i]) at once: roots hook onto the smallest root they are paired with,
+        # then the forest is flattened, until no pair spans two sets
+        parent = compress(self.parent)
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        while len(a):
+            root_a, root_b = parent[a], parent[b]
+            differ = root_a != root_b
+            a, b, root_a, root_b = a[differ], b[differ], root_a[differ], root_b[differ]
+            if not len(a):
+                break
+            np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+            parent = compress(parent)
+        self.parent = parent
+
+    def roots(self):
+        self.parent = compress(self.parent)
+        return self.parent
+
+    def count(self):
+        return int(np.count_nonzero(self.roots() == np.arange(len(self.parent))))
+
+
+def quotient(labels, src, dst, weights):
+    # contracted multigraph: every vertex goes to the super vertex of its label, self loops are dropped and
+    # parallel edges become one edge carrying the summed weight.
+    # Returns (super vertex of every vertex, src, dst, weights) with super vertices numbered 0..k-1
+    roots, members = np.unique(labels, return_inverse=True)
+    k = len(roots)
+    a, b = members[src], members[dst]
+    keep = a != b
+    lo, hi = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep])
+    keys, inverse = np.unique(lo * k + hi, return_inverse=True)
+    return members, keys // k, keys % k, np.bincount(inverse, weights=weights[keep], minlength=len(keys))
+
+
+def minimum_spanning_forest(n, src, dst, keys):
+    # Boruvka: every round each tree takes its cheapest outgoing edge, all of them are merged in one union_all.
+    # Edges are compared by their rank in keys, which makes ties impossible
+    order = np.argsort(keys, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    sets = DisjointSet(n)
+    chosen = []
+    live = np.nonzero(src != dst)[0]
+    while len(live):
+        parent = sets.roots()
+        root_a, root_b = parent[src[live]], parent[dst[live]]
+        differ = root_a != root_b
+        live, root_a, root_b = live[differ], root_a[differ], root_b[differ]
+        if not len(live):
+            break
+
+        cheapest = np.full(n, len(order), dtype=np.int64)
+        np.minimum.at(cheapest, root_a, rank[live])
+        np.minimum.at(cheapest, root_b, rank[live])
+        best = order[np.unique(cheapest[cheapest < len(order)])]
+        chosen.append(best)
+        sets.union_all(src[best], dst[best])
+
+    return np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+
+
+def contract_randomly(n, src, dst, weights, target, rng):
+    # Karger's contraction down to target super vertices. Contracting uniformly random remaining edges (weighted:
+    # proportionally to their weight) is Kruskal in the order of exponential clocks with rate = weight, so the
+    # contracted edges are the cheapest n - target edges of a random minimum spanning forest
+    keys = rng.exponential(size=len(src)) / weights
+    forest = minimum_spanning_forest(n, src, dst, keys)
+    forest = forest[np.argsort(keys[forest])][:max(0, n - target)]
+    sets = DisjointSet(n)
+    sets.union_all(src[forest], dst[forest])
+    return sets.roots()
+
+
+def exhaustive_cut(n, src, dst, weights):
+    # every split of a handful of vertices; vertex n - 1 always stays on the False side
+    if n < 2:
+        return np.inf, np.zeros(n, dtype=bool)
+    masks = np.arange(1, 2 ** (n - 1))
+    sides = (masks[:, None] >> np.arange(n)) & 1 == 1
+    cuts = (sides[:, src] != sides[:, dst]) @ weights
+    best = int(np.argmin(cuts))
+    return float(cuts[best]), sides[best]
+
+
+def karger(n, src, dst, weights, rng):
+    labels = contract_randomly(n, src, dst, weights, 2, rng)
+    side = labels != labels[0]
+    return float(weights[side[src] != side[dst]].sum()), side
+
+
+def karger_stein(n, src, dst, weights, rng):
+    # the exhaustive base case is cheaper in numpy than the recursion below it
+    if n <= 10:
+        return exhaustive_cut(n, src, dst, weights)
+
+    target = int(np.ceil(1 + n / np.sqrt(2)))
+    best = (np.inf, None)
+    for _ in range(2):
+        members, qsrc, qdst, qweights = quotient(contract_randomly(n, src, dst, weights, target, rng),
+                                                 src, dst, weights)
+        if int(members.max()) + 1 == n:
+            # nothing could be contracted, so the graph has more than one component and a cut of weight 0
+            sets = DisjointSet(n)
+            sets.union_all(src, dst)
+            return 0.0, sets.roots() != sets.roots()[0]
+        cut, side = karger_stein(int(members.max()) + 1, qsrc, qdst, qweights, rng)
+        if cut < best[0]:
+            best = (cut, side[members])
+
+    return best
+
+
+def _run_trials(graph, method, trials, seed, chunk):
+    # graph is (n, src, dst, weights), or (n, specs of the shared src, dst, weights) in a worker
+    if isinstance(graph[1], dict):
+        arrays = attached(graph[1])
+        graph = (graph[0], arrays["src"], arrays["dst"], arrays["weights"])
+    rng = np.random.default_rng([seed, chunk])
+    search = karger_stein if method == "karger_stein" else karger
+    best = (np.inf, None)
+    for _ in range(trials):
+        cut, side = search(*graph, rng)
+        if cut < best[0]:
+            best = (cut, side)
+    return best[0], np.nonzero(best[1])[0] if best[1] is not None else None
+
+
+def min_cut(graph, trials=100, method="karger", no_processes=None, seed=0):
+    # (cut weight, vertex names of the smaller side) of the best of trials randomized contractions
+    if method not in ("karger", "karger_stein"):
+        raise ValueError(f"Unknown min cut method {method}.")
+
+    names, src, dst, weights = edge_arrays(graph)
+    no_processes = no_processes or cpu_count()
+    chunks = min(trials, 4 * no_processes)
+    tasks = [(method, trials // chunks + (i < trials % chunks), seed, i) for i in range(chunks)]
+
+    if no_processes == 1:
+        results = [_run_trials((len(names), src, dst, weights), *task) for task in tasks]
+    else:
+        blocks = []
+        try:
+            _, specs = share_arrays({"src": src, "dst": dst, "weights": weights}, blocks)
+            results = executor.starmap(_run_trials, [((len(names), specs), *task) for task in tasks], no_processes,
+                                       chunksize=1)
+        finally:
+            release(blocks)
+
+    cut, side = min(results, key=lambda result: result[0])
+    if side is None:
+        return cut, None
+    if 2 * len(side) > len(names):
+        side = np.setdiff1d(np.arange(len(names)), side)
+    return cut, [names[i] for i in side]
+
+
+class Contraction:
+
+    def __init__(self, graph):
+        self.names, self.src, self.dst, self.weights = edge_arrays(graph)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.sets = DisjointSet(len(self.names))
+
+    def contract(self, edges):
+        # merges the endpoints of every edge, given as [vertex1, vertex2, ...]
+        pairs = np.array([(self.index[edge[0]], self.index[edge[1]]) for edge in edges], dtype=np.int64)
+        if len(pairs):
+            self.sets.union_all(pairs[:, 0], pairs[:, 1])
+
+    def contract_random(self, count, rng=None):
+        # contracts count random edges of the current quotient, Karger style
+        rng = rng or np.random.default_rng()
+        labels = self.sets.roots()
+        members, src, dst, weights = quotient(labels, self.src, self.dst, self.weights)
+        k = int(members.max()) + 1 if len(members) else 0
+        super_labels = contract_randomly(k, src, dst, weights, max(1, k - count), rng)
+        # super vertex -> its root, then every vertex to the root of its super vertex's new set
+        roots = np.unique(labels)
+        self.sets.union_all(roots, roots[super_labels])
+
+    def groups(self):
+        # representative name -> names of the contracted vertices, the representative is the first vertex
+        labels = self.sets.roots()
+        groups = {}
+        for i, label in enumerate(labels.tolist()):
+            groups.setdefault(self.names[label], []).append(self.names[i])
+        return groups
+
+    def quotient_arrays(self):
+        return quotient(self.sets.roots(), self.src, self.dst, self.weights)
+
+    def quotient_graph(self):
+        # undirected laborator1.Graph over the representatives with merged edge weights
+        from laborator1 import Graph
+        labels = self.sets.roots()
+        members, src, dst, weights = quotient(labels, self.src, self.dst, self.weights)
+        representatives = [self.names[root] for root in np.unique(labels).tolist()]
+        graph = Graph([], directed=False, weighted=True)
+        for name in representatives:
+            graph.add_vertex(name)
+        graph.add_edges([representatives[a], representatives[b], w] for a, b, w in
+                        zip(src.tolist(), dst.tolist(), weights.tolist()))
+        return graph
+
+
+if __name__ == "__main__":
+    import random
+    from timeit import default_timer
+    import networkx as nx
+    from laborator1 import Graph, read_from_file
+
+    facebook = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+
+    rng = random.Random(0)
+    sample = rng.sample(list(facebook.edges), 10000)
+    begin = default_timer()
+    contraction = Contraction(facebook)
+    contraction.contract(sample)
+    quotient_graph = contraction.quotient_graph()
+    elapsed = default_timer() - begin
+    print(f"facebook: 10000 edges contracted and quotient built in {elapsed:.3f}s, "
+          f"{quotient_graph.get_no_vertices()} vertices, {quotient_graph.get_no_edges()} edges left")
+
+    copy = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    edges = [edge for edge in sample[:200] if edge[0] != edge[1]]
+    begin = default_timer()
+    contracted = sum(copy.contract_edge(edge) is not None for edge in edges if edge in copy.edges)
+    print(f"Graph.contract_edge: {(default_timer() - begin) / contracted * 1000:.2f} ms per edge")
+
+    for no_processes in sorted({1, cpu_count()}):
+        begin = default_timer()
+        cut, side = min_cut(facebook, trials=32, no_processes=no_processes)
+        elapsed = default_timer() - begin
+        print(f"facebook karger, {no_processes} processes: {32 / elapsed:.1f} trials/s, min cut {cut}, "
+              f"{len(side)} vertices on the smaller side")
+
+    # two dense clusters joined by a few edges, compared against Stoer-Wagner
+    planted = nx.planted_partition_graph(2, 30, 0.5, 0.01, seed=1)
+    for u, v in planted.edges:
+        planted.edges[u, v]["weight"] = 1
+    expected = nx.stoer_wagner(planted)[0]
+    graph = Graph([[u, v, 1] for u, v in planted.edges], directed=False)
+    for method, trials in (("karger", 200), ("karger_stein", 4)):
+        begin = default_timer()
+        cut, side = min_cut(graph, trials=trials, method=method, no_processes=1)
+        print(f"planted 60 vertices, {method}: {trials} trials in {default_timer() - begin:.2f}s, "
+              f"min cut {cut}, Stoer-Wagner {expected}")
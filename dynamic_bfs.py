@@ -0,0 +1,226 @@
+import heapq
+from collections import deque
+
+
+class DynamicBFS:
+    # BFS levels from a single source of a laborator1.Graph, kept up to date through the mutators below.
+    # Insertions relax a wave outwards from the new arcs, deletions only revisit the vertices that
+    # lost every parent on the level above them.
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        self.recompute()
+
+    def recompute(self):
+        self.levels = {}
+        self.order = None
+        if self.source in self.graph.vertices:
+            self.levels[self.source] = 0
+            self.relax([self.source])
+        self.version = self.graph.version
+
+    def sync(self):
+        # the graph was changed behind our back
+        if self.graph.version != self.version:
+            self.recompute()
+
+    def out_neighbours(self, vertex):
+        return self.graph.vertices[vertex]["out_neigh"]
+
+    def relax(self, queue):
+        queue = deque(queue)
+        levels = self.levels
+        while queue:
+            vertex = queue.popleft()
+            level = levels[vertex] + 1
+            for node in self.out_neighbours(vertex):
+                if level < levels.get(node, level + 1):
+                    levels[node] = level
+                    queue.append(node)
+
+    def mutate(self, involved, mutator, *args):
+        self.sync()
+        vertices = self.graph.vertices
+        before = {vertex: list(vertices[vertex]["out_neigh"]) for vertex in involved if vertex in vertices}
+        result = mutator(*args)
+        after = {vertex: list(vertices[vertex]["out_neigh"]) if vertex in vertices else [] for vertex in before}
+        for vertex in involved:
+            if vertex not in before and vertex in vertices:
+                after[vertex] = list(vertices[vertex]["out_neigh"])
+
+        inserted = []
+        deleted = []
+        reordered = False
+        for vertex, nodes in after.items():
+            old = before.get(vertex, [])
+            if nodes == old:
+                continue
+            old_set, new_set = set(old), set(nodes)
+            inserted.extend((vertex, node) for node in nodes if node not in old_set)
+            deleted.extend((vertex, node) for node in old if node not in new_set)
+            if vertex in self.levels and [node for node in old if node in new_set] != \
+                    [node for node in nodes if node in old_set]:
+                reordered = True
+
+        self.update(inserted, deleted, [vertex for vertex in before if vertex not in vertices], reordered)
+        self.version = self.graph.version
+        return result
+
+    def update(self, inserted, deleted, removed, reordered):
+        levels = self.levels
+        vertices = self.graph.vertices
+        old_levels = {vertex: levels[vertex] for vertex in removed if vertex in levels}
+        for vertex in old_levels:
+            del levels[vertex]
+        if self.source not in vertices or self.source not in levels:
+            # the source was deleted, or has just been added back
+            self.recompute()
+            return
+
+        def level_of(vertex):
+            return levels[vertex] if vertex in levels else old_levels.get(vertex)
+
+        # a deleted tight arc can leave its head without a parent one level up
+        changed = reordered
+        candidates = []
+        for tail, head in deleted:
+            if head in levels and level_of(tail) is not None and levels[head] == level_of(tail) + 1:
+                heapq.heappush(candidates, (levels[head], head))
+                changed = True
+
+        # in increasing level order, so every affected vertex above a candidate is already known
+        affected = {}
+        while candidates:
+            level, vertex = heapq.heappop(candidates)
+            if vertex in affected or vertex == self.source:
+                continue
+            if any(levels.get(parent) == level - 1 and parent not in affected
+                   for parent in vertices[vertex]["in_neigh"]):
+                continue
+
+            affected[vertex] = level
+            for node in self.out_neighbours(vertex):
+                if levels.get(node) == level + 1 and node not in affected:
+                    heapq.heappush(candidates, (level + 1, node))
+
+        # new levels of the affected vertices, from their unaffected in-neighbours inwards
+        for vertex in affected:
+            del levels[vertex]
+        heap = []
+        for vertex in affected:
+            best = min((levels[parent] + 1 for parent in vertices[vertex]["in_neigh"] if parent in levels),
+                       default=None)
+            if best is not None:
+                heap.append((best, vertex))
+        heapq.heapify(heap)
+        while heap:
+            level, vertex = heapq.heappop(heap)
+            if vertex in levels:
+                continue
+            levels[vertex] = level
+            for node in self.out_neighbours(vertex):
+                if node in affected and node not in levels:
+                    heapq.heappush(heap, (level + 1, node))
+        # an in-arc added by the same mutation (contract_edge) can pull an affected vertex above its old level
+        self.relax(sorted((vertex for vertex in affected if vertex in levels), key=levels.get))
+
+        # insertions only ever shorten levels
+        for tail, head in inserted:
+            if tail in levels:
+                if levels[tail] + 1 < levels.get(head, levels[tail] + 2):
+                    levels[head] = levels[tail] + 1
+                    self.relax([head])
+                    changed = True
+                elif levels[head] == levels[tail] + 1:
+                    changed = True
+
+        if changed or affected or old_levels:
+            self.order = None
+
+    def add_edge(self, vertex1, vertex2, weight=None):
+        return self.mutate((vertex1, vertex2), self.graph.add_edge, vertex1, vertex2, weight)
+
+    def delete_edge(self, edge):
+        return self.mutate((edge[0], edge[1]), self.graph.delete_edge, edge)
+
+    def delete_vertex(self, vertex):
+        involved = [vertex]
+        if vertex in self.graph.vertices:
+            involved += list(self.graph.vertices[vertex]["in_neigh"]) + list(self.graph.vertices[vertex]["out_neigh"])
+        return self.mutate(involved, self.graph.delete_vertex, vertex)
+
+    def contract_edge(self, edge):
+        involved = [edge[0], edge[1]]
+        if edge[1] in self.graph.vertices:
+            involved += list(self.graph.vertices[edge[1]]["in_neigh"]) + \
+                list(self.graph.vertices[edge[1]]["out_neigh"])
+        return self.mutate(involved, self.graph.contract_edge, edge)
+
+    def distance(self, vertex):
+        self.sync()
+        return self.levels.get(vertex)
+
+    def bfs(self):
+        # same visiting order as laborator1.bfs: the levels only have to be walked, not searched
+        self.sync()
+        if self.order is None:
+            if self.source not in self.levels:
+                self.order = []
+                return []
+
+            levels = self.levels
+            order = [self.source]
+            seen = {self.source}
+            for vertex in order:
+                level = levels[vertex] + 1
+                for node in self.out_neighbours(vertex):
+                    if node not in seen and levels[node] == level:
+                        seen.add(node)
+                        order.append(node)
+            self.order = order
+
+        return list(self.order)
+
+
+if __name__ == "__main__":
+    import random
+    from timeit import default_timer
+    from laborator1 import Graph, bfs, read_from_file
+
+    graph = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    dynamic = DynamicBFS(graph, 0)
+    rng = random.Random(0)
+    vertices = list(graph.get_vertices())
+    changes = 10000
+    checks = 50
+
+    existing = list(graph.edges)
+    updates = 0
+    recomputation = 0
+    for i in range(changes):
+        edge = rng.choice(existing)
+        begin = default_timer()
+        if rng.random() < 0.5 and edge in graph.edges:
+            dynamic.delete_edge(edge)
+        else:
+            dynamic.add_edge(*rng.sample(vertices, 2), None)
+        updates += default_timer() - begin
+
+        if i % (changes // checks) == 0:
+            begin = default_timer()
+            expected = bfs(graph, 0)
+            recomputation += default_timer() - begin
+            assert dynamic.bfs() == expected
+
+    print(f"{changes} random edge changes: {updates:.3f}s incremental "
+          f"({1e6 * updates / changes:.1f} us per change)")
+    print(f"bfs recomputation: {recomputation / checks:.3f}s per run, "
+          f"{changes * recomputation / checks:.1f}s for one per change (extrapolated from {checks} runs)")
+    begin = default_timer()
+    dynamic.order = None
+    dynamic.bfs()
+    print(f"bfs order from the maintained levels: {default_timer() - begin:.3f}s")
+    begin = default_timer()
+    dynamic.recompute()
+    print(f"levels recomputed from scratch: {default_timer() - begin:.3f}s")
@@ -0,0 +1,146 @@
+import atexit
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+from time import perf_counter
+from shared import get_locks, install_locks
+
+# seconds of work a chunk should carry once the cost of a task is known: enough to hide the round trip
+# through the pool, little enough to keep every worker busy until the end
+TARGET = 0.02
+# at least this many chunks per worker, so one slow chunk does not leave the others idle
+BALANCE = 4
+# chunk size for a stream of unknown length whose tasks cost next to nothing
+MAX_CHUNK = 10000
+
+# number of processes -> Pool, started on first use and kept until shutdown(). Nothing is assumed inherited,
+# so the pool works under spawn and forkserver too: functions run through it are sent by reference and have
+# to be importable from a module, shared arrays travel as their block specs and are attached by the workers,
+# and the locks of shared.py are handed to every worker by the pool initializer
+_pools = {}
+# (module, name) of a function -> measured seconds per item
+_costs = {}
+
+
+def get_pool(no_processes=None):
+    no_processes = no_processes or cpu_count()
+    if no_processes not in _pools:
+        _pools[no_processes] = Pool(no_processes, initializer=install_locks, initargs=(get_locks(),))
+    return _pools[no_processes]
+
+
+def shutdown():
+    # lets the workers finish what they are running and joins them
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.close()
+        pool.join()
+
+
+atexit.register(shutdown)
+
+
+def chunk_size(cost, total, no_processes):
+    # items per chunk for tasks of cost seconds each (None when unknown), total items (None for a stream)
+    size = MAX_CHUNK if not cost else max(1, int(TARGET / cost))
+    if total is not None:
+        size = min(size, max(1, -(-total // (no_processes * BALANCE))))
+    return size
+
+
+def _record(key, elapsed, count):
+    cost = elapsed / max(count, 1)
+    _costs[key] = cost if key not in _costs else (_costs[key] + cost) / 2
+
+
+def _run_chunk(task):
+    function, chunk, star = task
+    begin = perf_counter()
+    results = [function(*item) for item in chunk] if star else [function(item) for item in chunk]
+    return results, perf_counter() - begin
+
+
+def _chunks(items, size):
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap(function, items, no_processes=None, chunksize=None, star=False):
+    # function over items (argument tuples when star) on the shared pool, results streamed in order. Without
+    # a chunksize the first item of every worker is sent alone and the time it takes sizes the other chunks,
+    # later calls start from the cost measured so far
+    no_processes = no_processes or cpu_count()
+    pool = get_pool(no_processes)
+    total = len(items) if hasattr(items, "__len__") else None
+    items = iter(items)
+    key = (function.__module__, function.__qualname__)
+
+    if chunksize is None and key not in _costs:
+        probe = [[item] for item in islice(items, no_processes)]
+        for results, elapsed in pool.imap(_run_chunk, [(function, chunk, star) for chunk in probe]):
+            _record(key, elapsed, 1)
+            yield from results
+        if total is not None:
+            total -= len(probe)
+
+    size = chunksize or chunk_size(_costs.get(key), total, no_processes)
+    for results, elapsed in pool.imap(_run_chunk, ((function, chunk, star) for chunk in _chunks(items, size))):
+        _record(key, elapsed, len(results))
+        yield from results
+
+
+def map(function, items, no_processes=None, chunksize=None, star=False):
+    return list(imap(function, items, no_processes, chunksize, star))
+
+
+def starmap(function, items, no_processes=None, chunksize=None):
+    return list(imap(function, items, no_processes, chunksize, star=True))
+
+
+if __name__ == "__main__":
+    from multiprocessing import Manager, Process
+    from timeit import default_timer
+    from procese import task, task_m
+
+    # the dispatch patterns procese.py used before, as the baseline
+    def process_per_item(numbers):
+        m_d = Manager().dict()
+        processes = [Process(target=task_m, args=(x, id, m_d)) for id, x in enumerate(numbers)]
+        started = []
+        try:
+            for p in processes:
+                p.start()
+                started.append(p)
+        finally:
+            for p in started:
+                p.join()
+        return [m_d[id] for id in range(len(numbers))]
+
+    def pool_per_call(numbers):
+        with Pool(12) as p:
+            return p.map(task, numbers)
+
+    def timed(function, numbers, repeats):
+        begin = default_timer()
+        for _ in range(repeats):
+            result = function(numbers)
+        assert result == [x ** 2 for x in numbers]
+        return (default_timer() - begin) / repeats
+
+    get_pool()
+    for size, repeats in ((10, 20), (10000, 5), (1000000, 1)):
+        numbers = list(range(size))
+        line = []
+        if size <= 10000:
+            try:
+                line.append(f"process per item {timed(process_per_item, numbers, 1):.3f}s")
+            except OSError as error:
+                # every process holds its pipes until the join, so thousands of them run out of descriptors
+                line.append(f"process per item failed ({error.strerror})")
+        line.append(f"Pool(12) per call {timed(pool_per_call, numbers, repeats):.3f}s")
+        _costs.clear()
+        line.append(f"executor, first call {timed(lambda items: map(task, items), numbers, 1):.3f}s")
+        line.append(f"warm {timed(lambda items: map(task, items), numbers, repeats):.3f}s")
+        print(f"{size} items: " + ", ".join(line))
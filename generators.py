@@ -0,0 +1,247 @@
+import numpy as np
+
+# edges per chunk the generators hand out; with the seed it fixes the output, so it is not a parameter
+CHUNK = 1 << 20
+# edges format_edges turns into text at a time, its index arrays are several times the size of the text
+LINES = 1 << 16
+# the Graph500 R-MAT initiator
+RMAT = (0.57, 0.19, 0.19, 0.05)
+
+# every generator below yields (src, dst, weights) chunks of int64 arrays, weights None unless a (low, high)
+# range was asked for, in which case they are uniform integers in low..high
+
+
+def _weights(rng, count, weights):
+    return None if weights is None else rng.integers(weights[0], weights[1] + 1, count)
+
+
+def _chunk_rng(seed, chunk):
+    return np.random.default_rng([seed, chunk])
+
+
+def _hash(seed, counters):
+    # splitmix64 of seed and every counter, as floats in [0, 1): random numbers that can be recomputed for any
+    # counter without generating the ones before it
+    z = counters.astype(np.uint64) + np.uint64((seed << 40) + 1 & 0xFFFFFFFFFFFFFFFF)
+    z *= np.uint64(0x9E3779B97F4A7C15)
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def rmat(scale, no_edges, probabilities=RMAT, weights=None, seed=0, scramble=True):
+    # R-MAT / Kronecker graph on 2 ** scale vertices: every edge picks one of the four quadrants of the
+    # adjacency matrix scale times. scramble relabels the vertices with a bijection of 0..2 ** scale - 1, so
+    # vertex ids do not give the degrees away; duplicate edges and self loops are kept, as in Graph500
+    a, b, c, _ = probabilities
+    mask = (1 << scale) - 1
+    for chunk, start in enumerate(range(0, no_edges, CHUNK)):
+        rng = _chunk_rng(seed, chunk)
+        count = min(CHUNK, no_edges - start)
+        src = np.zeros(count, dtype=np.int64)
+        dst = np.zeros(count, dtype=np.int64)
+        for bit in range(scale):
+            r = rng.random(count)
+            src |= (r >= a + b).astype(np.int64) << bit
+            dst |= (((r >= a) & (r < a + b)) | (r >= a + b + c)).astype(np.int64) << bit
+        if scramble:
+            # an odd multiplier and an offset modulo a power of two are a bijection
+            src = (src * 0x5DEECE66D + 0xB) & mask
+            dst = (dst * 0x5DEECE66D + 0xB) & mask
+        yield src, dst, _weights(rng, count, weights)
+
+
+def kronecker(scale, edge_factor=16, weights=None, seed=0):
+    # the Graph500 Kronecker graph: edge_factor * 2 ** scale R-MAT edges
+    return rmat(scale, edge_factor << scale, RMAT, weights, seed)
+
+
+def erdos_renyi(no_vertices, p, directed=True, weights=None, seed=0):
+    # G(n, p) without self loops: the present entries of the n x n adjacency matrix are walked in row major order
+    # with geometric gaps, so only the edges are ever generated. Undirected graphs keep every pair once, as u < v
+    total = no_vertices * no_vertices
+    position = -1
+    chunk = 0
+    while p > 0:
+        rng = _chunk_rng(seed, chunk)
+        positions = position + np.cumsum(rng.geometric(p, CHUNK))
+        positions = positions[positions < total]
+        if not len(positions):
+            return
+        position = int(positions[-1])
+        src, dst = positions // no_vertices, positions % no_vertices
+        keep = src < dst if not directed else src != dst
+        yield src[keep], dst[keep], _weights(rng, int(keep.sum()), weights)
+        chunk += 1
+
+
+def barabasi_albert(no_vertices, m, weights=None, seed=0):
+    # preferential attachment, vertex v joining with m edges, by Batagelj and Brandes' edge list: the target of
+    # edge i copies the endpoint at a uniform position r < 2 i + 1 of the list so far (sources at even positions,
+    # targets at odd ones). A target copying a target is followed back until it reaches a source, whose vertex
+    # is i // m; with r drawn by a hash of i the chase needs no record of earlier edges, so memory stays one
+    # chunk deep. Self loops (all of vertex 0's edges among them) are dropped
+    no_edges = no_vertices * m
+    for chunk, start in enumerate(range(0, no_edges, CHUNK)):
+        edges = np.arange(start, min(start + CHUNK, no_edges), dtype=np.int64)
+        pointers = np.floor(_hash(seed, edges) * (2 * edges + 1)).astype(np.int64)
+        pending = np.flatnonzero(pointers & 1)
+        while len(pending):
+            earlier = pointers[pending] >> 1
+            pointers[pending] = np.floor(_hash(seed, earlier) * (2 * earlier + 1)).astype(np.int64)
+            pending = pending[pointers[pending] & 1 == 1]
+
+        src, dst = edges // m, (pointers >> 1) // m
+        keep = src != dst
+        yield src[keep], dst[keep], _weights(_chunk_rng(seed, chunk), int(keep.sum()), weights)
+
+
+def grid(rows, columns, weights=None, seed=0):
+    # 4-neighbour rows x columns grid, vertex r * columns + c at coordinates (r, c), every edge once from its
+    # upper or left end
+    rows_per_chunk = max(1, CHUNK // (2 * columns))
+    for chunk, top in enumerate(range(0, rows, rows_per_chunk)):
+        rng = _chunk_rng(seed, chunk)
+        vertices = np.arange(top * columns, min(top + rows_per_chunk, rows) * columns, dtype=np.int64)
+        right = vertices[vertices % columns != columns - 1]
+        down = vertices[vertices < (rows - 1) * columns]
+        src = np.concatenate((right, down))
+        dst = np.concatenate((right + 1, down + columns))
+        yield src, dst, _weights(rng, len(src), weights)
+
+
+def grid_coordinates(vertices, columns):
+    vertices = np.asarray(vertices)
+    return vertices // columns, vertices % columns
+
+
+def grid_heuristic(columns, scale=1):
+    # heuristic(u, v) for a_star.astar and bidirectional_astar on a grid: the Manhattan distance times the
+    # lightest edge weight, scale, so it never overestimates
+    def heuristic(u, v):
+        return scale * (abs(u // columns - v // columns) + abs(u % columns - v % columns))
+    return heuristic
+
+
+def generate(kind, no_vertices, no_edges, weights=None, seed=0):
+    # the chunks of a kind of graph with about no_vertices vertices and no_edges edges
+    if kind == "rmat":
+        return rmat(max(1, int(np.ceil(np.log2(no_vertices)))), no_edges, weights=weights, seed=seed)
+    if kind == "erdos_renyi":
+        return erdos_renyi(no_vertices, min(1.0, no_edges / (no_vertices * (no_vertices - 1))), weights=weights,
+                           seed=seed)
+    if kind == "barabasi_albert":
+        return barabasi_albert(no_vertices, max(1, round(no_edges / no_vertices)), weights=weights, seed=seed)
+    if kind == "grid":
+        side = max(2, int(round(np.sqrt(no_vertices))))
+        return grid(side, side, weights=weights, seed=seed)
+    raise ValueError(f"Unknown graph kind {kind}.")
+
+
+def _digits(values):
+    # decimal digits of every non-negative value
+    return 1 + np.searchsorted(10 ** np.arange(1, 19, dtype=np.int64), values, side="right")
+
+
+def format_edges(src, dst, weights=None):
+    # the read_from_file lines "u v" or "u v w" of non-negative integer columns, as bytes
+    columns = [np.asarray(column, dtype=np.int64) for column in ((src, dst) if weights is None else
+                                                                 (src, dst, weights))]
+    if not len(columns[0]):
+        return b""
+    counts = [_digits(column) for column in columns]
+    lengths = sum(counts) + len(columns)
+    ends = np.cumsum(lengths)
+    buffer = np.empty(int(ends[-1]), dtype=np.uint8)
+    position = ends - lengths
+
+    for column, count in zip(columns, counts):
+        # digits from the last one backwards, dropping the values that have run out of them
+        last = position + count - 1
+        rows = np.arange(len(column))
+        for k in range(int(count.max())):
+            if k:
+                rows = rows[count[rows] > k]
+            buffer[last[rows] - k] = 48 + column[rows] // 10 ** k % 10
+        position = position + count
+        buffer[position] = 32
+        position = position + 1
+    buffer[ends - 1] = 10
+    return buffer.tobytes()
+
+
+def write_edges(name, chunks):
+    # streams the chunks to name in the read_from_file format, returns the number of edges written
+    written = 0
+    with open(name, "wb") as file:
+        for src, dst, weights in chunks:
+            for start in range(0, len(src), LINES):
+                end = start + LINES
+                file.write(format_edges(src[start:end], dst[start:end],
+                                        None if weights is None else weights[start:end]))
+            written += len(src)
+    return written
+
+
+def edge_arrays(chunks):
+    # (src, dst, weights or None) of all the chunks, for CSRGraph.from_arrays
+    chunks = list(chunks)
+    if not chunks:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), None
+    src, dst, weights = zip(*chunks)
+    return np.concatenate(src), np.concatenate(dst), None if weights[0] is None else np.concatenate(weights)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    import tracemalloc
+    from timeit import default_timer
+    from laborator1 import read_from_file
+
+    # edges per graph, the argument scales it towards the 100M a disk-sized test graph needs
+    no_edges = int(sys.argv[1]) if len(sys.argv) > 1 else 4000000
+    kinds = {"rmat": lambda: kronecker(max(1, int(np.log2(no_edges // 16))), weights=(1, 9)),
+             "erdos_renyi": lambda: erdos_renyi(no_edges // 16, 16 / (no_edges // 16 - 1), weights=(1, 9)),
+             "barabasi_albert": lambda: barabasi_albert(no_edges // 8, 8, weights=(1, 9)),
+             "grid": lambda: grid(int(np.sqrt(no_edges / 2)), int(np.sqrt(no_edges / 2)), weights=(1, 9))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, chunks in kinds.items():
+            begin = default_timer()
+            count = sum(len(src) for src, _, _ in chunks())
+            generated = default_timer() - begin
+
+            name = os.path.join(directory, kind + ".txt")
+            tracemalloc.start()
+            begin = default_timer()
+            written = write_edges(name, chunks())
+            elapsed = default_timer() - begin
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert written == count
+            size = os.path.getsize(name)
+            print(f"{kind:>16}: {count:,} edges, generated at {count / generated / 1e6:.1f}M edges/s, written at "
+                  f"{count / elapsed / 1e6:.1f}M edges/s ({size / elapsed / 2 ** 20:.0f} MiB/s), peak "
+                  f"{peak / 2 ** 20:.0f} MiB; 100M edges would take {elapsed * 1e8 / count:.0f}s and "
+                  f"{size * 1e8 / count / 2 ** 30:.1f} GiB")
+            os.remove(name)
+
+        # the same seed gives the same graph, the file reads back as it was written, G(n, p) has about p n (n - 1)
+        # edges and preferential attachment grows hubs that uniform graphs do not
+        first, second = edge_arrays(rmat(12, 100000, seed=7)), edge_arrays(rmat(12, 100000, seed=7))
+        assert all(np.array_equal(a, b) for a, b in zip(first[:2], second[:2]))
+        name = os.path.join(directory, "small.txt")
+        src, dst, weights = edge_arrays(barabasi_albert(1000, 3, weights=(1, 9)))
+        write_edges(name, [(src, dst, weights)])
+        assert read_from_file(name) == [[u, v, w] for u, v, w in zip(src.tolist(), dst.tolist(), weights.tolist())]
+
+        src, _, _ = edge_arrays(erdos_renyi(10000, 0.001))
+        print(f"erdos_renyi(10000, 0.001): {len(src)} edges, {0.001 * 10000 * 9999:.0f} expected")
+        src, dst, _ = edge_arrays(barabasi_albert(10000, 5))
+        print(f"barabasi_albert(10000, 5): max degree {np.bincount(np.concatenate((src, dst))).max()}, mean "
+              f"{2 * len(src) / 10000:.1f}")
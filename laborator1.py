@@ -1,75 +1,194 @@
-from multiprocessing import Process, Pool, cpu_count
-from multiprocessing.managers import BaseManager
-import matplotlib.pyplot as plt
-import networkx as nx
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import cpu_count
+from time import perf_counter
+import executor
+import layout
+from shared import StripedArray, attached, release, share_arrays
+import numpy as np
 import random
-import copy
+import gc
+import os
+import zipfile
 
 
 class Graph:
 
     def __init__(self, edges_list=None, directed=True, weighted=True, graph=None):
+        if isinstance(graph, CSRGraph):
+            graph = graph.to_graph()
+
         if graph:
             self.vertices = graph.vertices
             self.edges = graph.edges
+            self.directed = graph.directed
+            self.weighted = graph.weighted
+            # the alias shares the counter with the dicts, so a mutation through either makes both stale
+            self._version = graph._version
 
         else:
-            self.edges: list = copy.deepcopy(edges_list)
+            # (u, v) -> [u, v, weight], insertion ordered like the old edge list
+            self.edges: dict = {}
             self.vertices = {}
             self.directed = directed
             self.weighted = weighted
+            # bumped by every mutator so cached query results can tell they are stale; one element list so
+            # that Graph(graph=...) aliases share it
+            self._version = [0]
 
-            for edge in edges_list:
-                self.add_vertex(edge[0])
-                self.add_vertex(edge[1])
-                self.add_neighbour_to_vertex(edge[0], edge[1])
-                if not self.directed:
-                    self.edges.append([edge[1], edge[0], edge[2]])
+            self.add_edges(edges_list)
+
+        # (version, CSRGraph) for the parallel searches, see csr_view
+        self._csr = None
+
+    @classmethod
+    def from_file(cls, name, directed=True, weighted=True):
+        return cls(read_from_file(name), directed=directed, weighted=weighted)
+
+    @property
+    def version(self):
+        return self._version[0]
+
+    @version.setter
+    def version(self, value):
+        self._version[0] = value
 
     def get_vertices_obj(self):
         return self.vertices
 
+    # neighbour collections are dicts used as insertion ordered sets
     def add_neighbour_to_vertex(self, vertex, neighbour):
 
-        if vertex not in self.vertices[neighbour]["in_neigh"]:
-            self.vertices[neighbour]["in_neigh"].append(vertex)
-        if neighbour not in self.vertices[vertex]["out_neigh"]:
-            self.vertices[vertex]["out_neigh"].append(neighbour)
+        self.version += 1
+        self.vertices[neighbour]["in_neigh"][vertex] = None
+        self.vertices[vertex]["out_neigh"][neighbour] = None
 
         if not self.directed:
-            if vertex not in self.vertices[neighbour]["out_neigh"]:
-                self.vertices[neighbour]["out_neigh"].append(vertex)
-            if neighbour not in self.vertices[vertex]["in_neigh"]:
-                self.vertices[vertex]["in_neigh"].append(neighbour)
+            self.vertices[neighbour]["out_neigh"][vertex] = None
+            self.vertices[vertex]["in_neigh"][neighbour] = None
 
     def delete_neighbour_from_vertex(self, vertex, neighbour):
 
-        if neighbour in self.vertices[vertex]["in_neigh"]:
-            self.vertices[vertex]["in_neigh"].remove(neighbour)
-        if neighbour in self.vertices[vertex]["out_neigh"]:
-            self.vertices[vertex]["out_neigh"].remove(neighbour)
+        self.version += 1
+        self.vertices[vertex]["in_neigh"].pop(neighbour, None)
+        self.vertices[vertex]["out_neigh"].pop(neighbour, None)
 
     def get_vertices(self):
         return self.vertices.keys()
 
     def get_edges(self):
-        return self.edges
+        return list(self.edges.values())
 
     def add_edge(self, vertex1, vertex2, weight=None):
 
+        self.version += 1
         self.add_vertex(vertex1)
         self.add_vertex(vertex2)
         self.add_neighbour_to_vertex(vertex1, vertex2)
 
-        if [vertex1, vertex2, weight] not in self.edges:
-            self.edges.append([vertex1, vertex2, weight])
+        if (vertex1, vertex2) not in self.edges:
+            self.edges[(vertex1, vertex2)] = [vertex1, vertex2, weight]
+
+        if not self.directed and (vertex2, vertex1) not in self.edges:
+            self.edges[(vertex2, vertex1)] = [vertex2, vertex1, weight]
+
+    def add_edges(self, edges_list):
+        # bulk add_edge: the same vertices, edges and neighbour order as adding the edges one by one
+        edges = self.edges
+        vertices = self.vertices
+        added = {}
+
+        with _paused_gc():
+            for edge in edges_list:
+                vertex1, vertex2 = edge[0], edge[1]
+                if vertex1 not in vertices:
+                    vertices[vertex1] = {"in_neigh": {}, "out_neigh": {}}
+                if vertex2 not in vertices:
+                    vertices[vertex2] = {"in_neigh": {}, "out_neigh": {}}
+
+                if (vertex1, vertex2) not in edges and (vertex1, vertex2) not in added:
+                    added[(vertex1, vertex2)] = edge[2]
+                if not self.directed and (vertex2, vertex1) not in edges and (vertex2, vertex1) not in added:
+                    added[(vertex2, vertex1)] = edge[2]
+
+            self._apply_edge_changes(added, {})
+
+    def apply_edges(self, operations):
+        # ("add", vertex1, vertex2, weight) and ("delete", vertex1, vertex2) operations, applied with a single
+        # adjacency update: operations on the same edge collapse first, then deletions run before insertions.
+        # Inserting an existing edge keeps its weight and position like add_edge, re-inserting a deleted one
+        # moves it to the end
+        edges = self.edges
+        vertices = self.vertices
+        undirected = not self.directed
+        added = {}
+        deleted = {}
+
+        with _paused_gc():
+            for operation in operations:
+                vertex1, vertex2 = operation[1], operation[2]
+
+                if operation[0] == "add":
+                    # vertices appear at the time of their first insertion, like with add_edge
+                    if vertex1 not in vertices:
+                        vertices[vertex1] = {"in_neigh": {}, "out_neigh": {}}
+                    if vertex2 not in vertices:
+                        vertices[vertex2] = {"in_neigh": {}, "out_neigh": {}}
+                    key = (vertex1, vertex2)
+                    if key not in added and (key not in edges or key in deleted):
+                        added[key] = operation[3]
+                    if undirected:
+                        key = (vertex2, vertex1)
+                        if key not in added and (key not in edges or key in deleted):
+                            added[key] = operation[3]
+
+                elif operation[0] == "delete":
+                    key = (vertex1, vertex2)
+                    added.pop(key, None)
+                    if key in edges:
+                        deleted[key] = None
+                    if undirected:
+                        key = (vertex2, vertex1)
+                        added.pop(key, None)
+                        if key in edges:
+                            deleted[key] = None
+
+                else:
+                    raise ValueError(f"Unknown edge operation {operation[0]}.")
+
+            self._apply_edge_changes(added, deleted)
 
-        if not self.directed and [vertex2, vertex1, weight] not in self.edges:
-            self.edges.append([vertex2, vertex1, weight])
+    def _apply_edge_changes(self, added, deleted):
+        edges = self.edges
+        vertices = self.vertices
+
+        for vertex1, vertex2 in deleted:
+            del edges[(vertex1, vertex2)]
+            if vertex1 in vertices:
+                vertices[vertex1]["out_neigh"].pop(vertex2, None)
+            if vertex2 in vertices:
+                vertices[vertex2]["in_neigh"].pop(vertex1, None)
+
+        for (vertex1, vertex2), weight in added.items():
+            edges[(vertex1, vertex2)] = [vertex1, vertex2, weight]
+            vertices[vertex1]["out_neigh"][vertex2] = None
+            vertices[vertex2]["in_neigh"][vertex1] = None
+
+        self.version += 1
+
+    @contextmanager
+    def batch(self):
+        # with graph.batch() as batch: batch.add_edge(...); batch.delete_edge(...) -- applied when the block exits
+        # recording happens with the collector paused as well, the buffered operations all outlive the block
+        batch = EdgeBatch()
+        with _paused_gc():
+            yield batch
+            self.apply_edges(batch.operations)
 
     def add_vertex(self, vertex):
-        if vertex not in self.vertices.keys():
-            self.vertices[vertex] = {"in_neigh": [], "out_neigh": []}
+        if vertex not in self.vertices:
+            self.version += 1
+            self.vertices[vertex] = {"in_neigh": {}, "out_neigh": {}}
 
     def get_no_vertices(self):
         return len(self.vertices.keys())
@@ -85,23 +204,38 @@ class Graph:
 
     def get_neighbours_of_vertex(self, vertex):
         if vertex in self.vertices.keys():
-            return self.vertices[vertex]["in_neigh"], self.vertices[vertex]["out_neigh"]
+            return list(self.vertices[vertex]["in_neigh"]), list(self.vertices[vertex]["out_neigh"])
+
+        return None
+
+    # views of the neighbour sets instead of copies, for traversals that only read them
+    def get_out_neighbours(self, vertex):
+        if vertex in self.vertices:
+            return self.vertices[vertex]["out_neigh"].keys()
+
+        return None
+
+    def get_in_neighbours(self, vertex):
+        if vertex in self.vertices:
+            return self.vertices[vertex]["in_neigh"].keys()
 
         return None
 
     def check_if_vertices_are_neighbours(self, vertex1, vertex2):
 
-        if vertex1 in self.get_neighbours_of_vertex(vertex2)[0] or vertex1 in self.get_neighbours_of_vertex(vertex2)[
-            1] or vertex2 in self.get_neighbours_of_vertex(vertex1)[0] or vertex2 in \
-                self.get_neighbours_of_vertex(vertex1)[1]:
+        neighbours1 = self.vertices[vertex1]
+        neighbours2 = self.vertices[vertex2]
+        if vertex1 in neighbours2["in_neigh"] or vertex1 in neighbours2["out_neigh"] or \
+                vertex2 in neighbours1["in_neigh"] or vertex2 in neighbours1["out_neigh"]:
             return True
         return False
 
     def delete_vertex(self, vertex):
 
         if vertex in self.vertices.keys():
-            in_neigh = copy.deepcopy(self.vertices[vertex]["in_neigh"])
-            out_neigh = copy.deepcopy(self.vertices[vertex]["out_neigh"])
+            self.version += 1
+            in_neigh = list(self.vertices[vertex]["in_neigh"])
+            out_neigh = list(self.vertices[vertex]["out_neigh"])
 
             for neighbour in in_neigh:
                 self.delete_neighbour_from_vertex(neighbour, vertex)
@@ -120,24 +254,24 @@ class Graph:
 
     def delete_edge(self, edge):
 
-        edges = copy.deepcopy(self.edges)
-        for current_edge in edges:
-            if current_edge[0] == edge[0] and current_edge[1] == edge[1]:
-                self.edges.remove(current_edge)
-                self.delete_neighbour_from_vertex(edge[0], edge[1])
-                self.delete_neighbour_from_vertex(edge[1], edge[0])
-                return current_edge
+        current_edge = self.edges.pop((edge[0], edge[1]), None)
+        if current_edge is not None:
+            self.version += 1
+            self.delete_neighbour_from_vertex(edge[0], edge[1])
+            self.delete_neighbour_from_vertex(edge[1], edge[0])
+            return current_edge
 
         return None
 
     def contract_edge(self, edge):
 
+        self.version += 1
         deleted_edge = self.delete_edge([edge[0], edge[1]])
         if not self.directed:
             self.delete_edge([edge[1], edge[0]])
 
-        in_neigh = copy.deepcopy(self.vertices[edge[1]]["in_neigh"])
-        out_neigh = copy.deepcopy(self.vertices[edge[1]]["out_neigh"])
+        in_neigh = list(self.vertices[edge[1]]["in_neigh"])
+        out_neigh = list(self.vertices[edge[1]]["out_neigh"])
 
         for neighbour in in_neigh:
             if edge[0] != neighbour:
@@ -157,207 +291,740 @@ class Graph:
         self.delete_vertex(edge[1])
         return edge if deleted_edge else None
 
-    def draw_graph(self, specific_vertex=None):
+    def draw_graph(self, specific_vertex=None, **options):
+        return layout.draw_graph(self, specific_vertex, **options)
 
-        G = nx.Graph()
-        pos = {}
-        used_pos_x = []
-        used_pos_y = []
 
-        if specific_vertex is None:
-            for vertex in self.vertices.keys():
-                G.add_node(str(vertex))
+@contextmanager
+def _paused_gc():
+    # bulk loads allocate hundreds of thousands of long lived containers, each one counting towards
+    # another full collection that finds nothing to free
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
-                x = random.uniform(1, 10000000000)
-                while x in used_pos_x:
-                    x = round(random.uniform(1, 10000000000), 1)
-                y = random.uniform(1, 10000000000)
-                while y in used_pos_y:
-                    y = round(random.rand(1, 10000000000), 1)
 
-                pos[str(vertex)] = (x, y)
-                used_pos_x.append(x)
-                used_pos_y.append(y)
+class EdgeBatch:
 
-            for edge in self.edges:
-                if not self.weighted:
-                    G.add_edge(str(edge[0]), str(edge[1]))
-                else:
-                    G.add_edge(str(edge[0]), str(edge[1]), weight=str(edge[2]))
+    def __init__(self):
+        self.operations = []
+
+    def add_edge(self, vertex1, vertex2, weight=None):
+        self.operations.append(("add", vertex1, vertex2, weight))
 
-        elif specific_vertex in self.vertices.keys():
-            G.add_node(str(specific_vertex))
-            x = random.uniform(1, 10000000000)
-            y = random.uniform(1, 10000000000)
-            used_pos_x.append(x)
-            used_pos_y.append(y)
-            pos[str(specific_vertex)] = (x, y)
+    def delete_edge(self, edge):
+        self.operations.append(("delete", edge[0], edge[1]))
 
-            for vertex in self.vertices[specific_vertex]["neighbours"]:
-                G.add_node(str(vertex))
-                G.add_edge(str(specific_vertex), str(vertex))
 
-                while x in used_pos_x:
-                    x = round(random.uniform(1, 10000000000), 1)
-                while y in used_pos_y:
-                    y = round(random.uniform(1, 10000000000), 1)
+class CSRGraph:
 
-                pos[str(vertex)] = (x, y)
-                used_pos_x.append(x)
-                used_pos_y.append(y)
+    def __init__(self, edges_list=None, directed=True, weighted=True, graph=None):
+        symmetric = not directed
+        if graph:
+            # walk the adjacency of the dict backend so neighbours keep their order
+            weights_of = {(edge[0], edge[1]): edge[2] for edge in graph.get_edges()}
+            edges_list = [[vertex, neighbour, weights_of.get((vertex, neighbour))] for vertex in graph.get_vertices()
+                          for neighbour in graph.get_out_neighbours(vertex)]
+            directed = graph.directed
+            weighted = graph.weighted
+            symmetric = False
+
+        src = np.array([edge[0] for edge in edges_list], dtype=np.int64)
+        dst = np.array([edge[1] for edge in edges_list], dtype=np.int64)
+        weights = None
+        if weighted:
+            weights = np.array([np.nan if edge[2] is None else edge[2] for edge in edges_list], dtype=np.float64)
+
+        self._build(src, dst, weights, directed, weighted, symmetric)
+
+    @classmethod
+    def from_arrays(cls, src, dst, weights=None, directed=True, weighted=True):
+        csr = cls.__new__(cls)
+        csr._build(np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64),
+                   None if weights is None or not weighted else np.asarray(weights, dtype=np.float64),
+                   directed, weighted, not directed)
+        return csr
+
+    @classmethod
+    def from_file(cls, name, directed=True, weighted=True):
+        src, dst, weight, has_weight = load_edge_arrays(name)
+        return cls.from_arrays(src, dst, np.where(has_weight, weight, np.nan), directed=directed, weighted=weighted)
+
+    def _build(self, src, dst, weights, directed, weighted, symmetric):
+        self.directed = directed
+        self.weighted = weighted
+
+        self.labels = np.unique(np.concatenate((src, dst)))
+        n = len(self.labels)
+        # SNAP style files number their vertices 0..n-1, so the labels can be used as row ids directly
+        self.dense = n == 0 or (self.labels[0] == 0 and self.labels[-1] == n - 1)
+        if not self.dense:
+            src = np.searchsorted(self.labels, src)
+            dst = np.searchsorted(self.labels, dst)
+
+        if symmetric:
+            # interleave (u, v) and (v, u) so neighbours keep the order in which the edges were read
+            src, dst = np.column_stack((src, dst)).ravel(), np.column_stack((dst, src)).ravel()
+            if weights is not None:
+                weights = np.repeat(weights, 2)
+
+        # keep the first occurrence of every (u, v) pair, like the neighbour lists of Graph do
+        _, first = np.unique(src * max(n, 1) + dst, return_index=True)
+        first.sort()
+        src, dst = src[first], dst[first]
+        if weights is not None:
+            weights = weights[first]
+
+        self.indptr, self.indices, self.weights = self._compress(src, dst, weights, n)
+        self.in_indptr, self.in_indices, self.in_weights = self._compress(dst, src, weights, n)
+
+    @staticmethod
+    def _compress(rows, cols, weights, n):
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        index_type = np.int32 if n < 2 ** 31 else np.int64
+        return indptr, cols[order].astype(index_type), None if weights is None else weights[order]
+
+    def _id(self, vertex):
+        if self.dense:
+            return vertex if 0 <= vertex < len(self.labels) else None
+
+        i = int(np.searchsorted(self.labels, vertex))
+        return i if i < len(self.labels) and self.labels[i] == vertex else None
+
+    def _names(self, ids):
+        return ids.tolist() if self.dense else self.labels[ids].tolist()
+
+    def to_graph(self):
+        graph = Graph(self.get_edges(), directed=True, weighted=self.weighted)
+        graph.directed = self.directed
+        return graph
 
+    def get_vertices(self):
+        return self.labels.tolist()
+
+    def get_edges(self):
+        rows = np.repeat(np.arange(len(self.labels)), np.diff(self.indptr))
+        if self.weights is None:
+            weights = [None] * len(rows)
         else:
-            print(f"Vertex {specific_vertex} does not exist")
+            # whole weights come back as the ints they were read as, anything else keeps its fraction
+            finite = self.weights[~np.isnan(self.weights)]
+            kind = int if np.array_equal(finite, np.floor(finite)) else float
+            weights = [None if np.isnan(w) else kind(w) for w in self.weights.tolist()]
+        return [list(edge) for edge in zip(self._names(rows), self._names(self.indices), weights)]
 
-        nx.draw(G, pos=pos, with_labels=True, node_color="red", node_size=500, font_color="white", font_size=20,
-                font_family="Times New Roman", font_weight="bold", width=3, edge_color="black")
-        plt.margins(0.2)
-        plt.show()
+    def get_no_vertices(self):
+        return len(self.labels)
 
+    def get_no_edges(self):
+        return len(self.indices) if self.directed else int(len(self.indices)/2)
 
-def bfs(graph, start_node):
-    visited = [False] * (len(graph.edges) + 1)
-    queue = []
-    result = []
-    queue.append(start_node)
-    visited[start_node] = True
+    def get_degrees_of_vertex(self, vertex):
+        i = self._id(vertex)
+        if i is not None:
+            return int(self.in_indptr[i + 1] - self.in_indptr[i]), int(self.indptr[i + 1] - self.indptr[i])
 
-    while queue:
-        vertex = queue.pop(0)
-        result.append(vertex)
+        return None
 
-        for node in graph.vertices[vertex]["out_neigh"]:
-            if visited[node] is False:
-                queue.append(node)
-                visited[node] = True
+    def get_neighbours_of_vertex(self, vertex):
+        i = self._id(vertex)
+        if i is not None:
+            in_start, in_end = self.in_indptr[i:i + 2].tolist()
+            start, end = self.indptr[i:i + 2].tolist()
+            return self._names(self.in_indices[in_start:in_end]), self._names(self.indices[start:end])
 
-            print(node)
+        return None
 
-    return result
+    def get_out_neighbours(self, vertex):
+        i = self._id(vertex)
+        if i is not None:
+            start, end = self.indptr[i:i + 2].tolist()
+            return self._names(self.indices[start:end])
 
+        return None
 
-class MyManager(BaseManager):
-    pass
+    def get_in_neighbours(self, vertex):
+        i = self._id(vertex)
+        if i is not None:
+            start, end = self.in_indptr[i:i + 2].tolist()
+            return self._names(self.in_indices[start:end])
 
+        return None
 
-MyManager.register("Graph", Graph)
+    def check_if_vertices_are_neighbours(self, vertex1, vertex2):
+        i, j = self._id(vertex1), self._id(vertex2)
+        if i is None or j is None:
+            return False
 
+        return bool(np.any(self.indices[self.indptr[i]:self.indptr[i + 1]] == j) or
+                    np.any(self.indices[self.indptr[j]:self.indptr[j + 1]] == i))
 
-def delete_ingoing_edges(shared_memory: Graph, node, in_neigh):
-    shared_memory.delete_edge([in_neigh, node])
+    def nbytes(self):
+        arrays = [self.labels, self.indptr, self.indices, self.in_indptr, self.in_indices, self.weights, self.in_weights]
+        return sum(array.nbytes for array in arrays if array is not None)
 
 
-def pbfs(graph, directed, weighted, start_node):
+class Visitor:
+    # traversal callbacks, override the ones you need; traversals look up which hooks a visitor overrides once
+    # and skip the rest, so no visitor (or an unused hook) adds nothing to their inner loops
 
-    visited = [False] * (len(graph.edges) + 1)
-    queue = []
-    result = []
-    queue.append(start_node)
-    visited[start_node] = True
+    def on_discover(self, vertex, parent, level):
+        pass
 
-    # MyManager.register("Graph", Graph)
-    with MyManager() as my_manager:
-        shared_memory = my_manager.Graph(directed=directed, weighted=weighted, graph=graph)
+    def on_visit(self, vertex, level):
+        pass
 
-        while queue:
-            vertex = queue.pop(0)
-            result.append(vertex)
+    def on_edge(self, vertex, neighbour):
+        pass
 
-            for node in shared_memory.get_vertices_obj()[vertex]["out_neigh"]:
-                processes = list()
+    def on_level_end(self, level, frontier, edges):
+        pass
 
-                for in_neigh in shared_memory.get_vertices_obj()[node]["in_neigh"]:
-                    p = Process(target=delete_ingoing_edges, args=(shared_memory, node, in_neigh))
-                    processes.append(p)
 
-                for p in processes:
-                    p.start()
+def visitor_hooks(visitor):
+    # (on_discover, on_visit, on_edge, on_level_end) bound to visitor, None for every hook it leaves alone
+    names = ("on_discover", "on_visit", "on_edge", "on_level_end")
+    if visitor is None:
+        return (None,) * len(names)
+    # duck typed visitors need not define every hook; Visitor's own no-ops count as missing
+    return tuple(getattr(visitor, name, None) if getattr(type(visitor), name, None) is not getattr(Visitor, name)
+                 else None for name in names)
 
-                for p in processes:
-                    p.join()
 
-                if visited[node] is False:
-                    queue.append(node)
-                    visited[node] = True
+class Counters(Visitor):
+    # edges are counted one by one where a traversal reports them (bfs, dfs, direction_optimizing_bfs) and from
+    # the level totals where it does not (parallel_bfs); dfs has no levels, so it times none
 
-                # print(shared_memory.get_edges())
-                print(node)
+    def __init__(self):
+        self.edges_scanned = 0
+        self._level_edges = 0
+        self.vertices_visited = 0
+        self.vertices_discovered = 0
+        self.queue_high_water = 0
+        self.level_times = []
+        self._level_start = perf_counter()
 
-    return result
+    def on_discover(self, vertex, parent, level):
+        if parent is None and level == 0:
+            self._level_start = perf_counter()
+        self.vertices_discovered += 1
+        # discovered but not yet visited is what sits in the queue
+        self.queue_high_water = max(self.queue_high_water, self.vertices_discovered - self.vertices_visited)
 
+    def on_visit(self, vertex, level):
+        self.vertices_visited += 1
 
-def poolbfs(graph, directed, weighted, start_node):
+    def on_edge(self, vertex, neighbour):
+        self.edges_scanned += 1
+        self._level_edges += 1
 
-    visited = [False] * (len(graph.edges) + 1)
-    queue = []
-    result = []
-    queue.append(start_node)
-    visited[start_node] = True
-    # MyManager.register("Graph", Graph)
+    def on_level_end(self, level, frontier, edges):
+        now = perf_counter()
+        # only the edges of the level that on_edge did not count already
+        self.edges_scanned += edges - self._level_edges
+        self._level_edges = 0
+        self.level_times.append(now - self._level_start)
+        self._level_start = now
 
-    average = 0
-    count = 0
-    for node in graph.vertices.keys():
-        for out_neigh in graph.vertices[node]["out_neigh"]:
-            for in_neigh in graph.vertices[out_neigh]["in_neigh"]:
-                average += in_neigh
-            count += len(graph.vertices[out_neigh]["in_neigh"])
+    def __repr__(self):
+        return (f"Counters(edges_scanned={self.edges_scanned}, vertices_visited={self.vertices_visited}, "
+                f"queue_high_water={self.queue_high_water}, levels={len(self.level_times)}, "
+                f"time={sum(self.level_times):.4f}s)")
 
-    no_processes = min(int(average/count), cpu_count())
 
-    with Pool(no_processes) as pool:
-        with MyManager() as my_manager:
-            shared_memory = my_manager.Graph(directed=directed, weighted=weighted, graph=graph)
+class PrintVisitor(Visitor):
+    # what bfs used to print: every neighbour it examines
+    def __init__(self, file=None):
+        self.file = file
 
-            while queue:
-                vertex = queue.pop(0)
-                result.append(vertex)
+    def on_edge(self, vertex, neighbour):
+        print(neighbour, file=self.file)
 
-                for node in shared_memory.get_vertices_obj()[vertex]["out_neigh"]:
 
-                    pool.starmap(delete_ingoing_edges, [(shared_memory, node, in_neigh) for in_neigh in shared_memory.get_vertices_obj()[node]["in_neigh"]])
+def bfs(graph, start_node, visitor=None):
+    if visitor is None:
+        visited = {start_node}
+        queue = deque([start_node])
+        result = []
 
-                    if visited[node] is False:
-                        queue.append(node)
-                        visited[node] = True
+        while queue:
+            vertex = queue.popleft()
+            result.append(vertex)
+
+            for node in graph.get_out_neighbours(vertex):
+                if node not in visited:
+                    queue.append(node)
+                    visited.add(node)
 
-                    # print(shared_memory.get_edges())
-                    print(node)
+        return result
+
+    # the same order level by level, so on_level_end can be reported
+    on_discover, on_visit, on_edge, on_level_end = visitor_hooks(visitor)
+    visited = {start_node}
+    frontier = [start_node]
+    result = []
+    level = 0
+    if on_discover:
+        on_discover(start_node, None, 0)
+
+    while frontier:
+        next_frontier = []
+        edges = 0
+        for vertex in frontier:
+            result.append(vertex)
+            if on_visit:
+                on_visit(vertex, level)
+
+            neighbours = graph.get_out_neighbours(vertex)
+            edges += len(neighbours)
+            for node in neighbours:
+                if on_edge:
+                    on_edge(vertex, node)
+                if node not in visited:
+                    next_frontier.append(node)
+                    visited.add(node)
+                    if on_discover:
+                        on_discover(node, vertex, level + 1)
+
+        if on_level_end:
+            on_level_end(level, len(frontier), edges)
+        frontier = next_frontier
+        level += 1
 
     return result
 
 
-def dfs(graph, vertex):
+# visit tag of the vertices no chunk has claimed yet
+UNVISITED = np.iinfo(np.int64).max
+
+
+def _expand_frontier(specs, visited, start, end, offset, tag):
+    arrays = attached(specs)
+    indptr = arrays["indptr"]
+    indices = arrays["indices"]
+    frontier = arrays["frontier"][start:end]
+
+    # gather the out-neighbours of the whole chunk at once, in the order a serial bfs would see them
+    begins = indptr[frontier]
+    lengths = indptr[frontier + 1] - begins
+    positions = np.repeat(begins - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    neighbours = indices[positions]
+    # skip what an earlier level or an earlier chunk of this one has claimed already
+    neighbours = neighbours[visited.array[neighbours] > tag]
+
+    _, first = np.unique(neighbours, return_index=True)
+    neighbours = neighbours[np.sort(first)]
+    visited.minimum(neighbours, tag)
+    arrays["scratch"][offset:offset + len(neighbours)] = neighbours
+    return len(neighbours)
+
+
+def csr_view(graph):
+    # the CSRGraph of a dict Graph, kept on it until a mutation bumps its version
+    if isinstance(graph, CSRGraph):
+        return graph
+    if graph._csr is None or graph._csr[0] != graph.version:
+        graph._csr = (graph.version, CSRGraph(graph=graph))
+    return graph._csr[1]
 
-    def dfs_util(graph, vertex, visited, result):
-        visited.add(vertex)
-        result.append(vertex)
 
-        for neighbour in graph.vertices[vertex]["out_neigh"]:
+def parallel_bfs(graph, start_node, no_processes=None, visitor=None):
+    csr = csr_view(graph)
+    start = csr._id(start_node)
+    if start is None:
+        return None
+
+    no_processes = no_processes or cpu_count()
+    n = csr.get_no_vertices()
+    blocks = []
+    # the tag of a vertex is level * no_processes + the chunk that found it, and the workers keep the smallest:
+    # a vertex found by several chunks belongs to the first one, like in the serial bfs, whatever order they
+    # run in
+    visited = StripedArray(n, np.int64, UNVISITED)
+
+    try:
+        arrays, specs = share_arrays({"indptr": csr.indptr, "indices": csr.indices,
+                                      "frontier": np.zeros(n, dtype=csr.indices.dtype),
+                                      "scratch": np.zeros(len(csr.indices), dtype=csr.indices.dtype)}, blocks)
+        indptr = arrays["indptr"]
+        frontier = arrays["frontier"]
+        scratch = arrays["scratch"]
+
+        visited.array[start] = 0
+        frontier[0] = start
+        size = 1
+        levels = [frontier[:1].copy()]
+
+        # edges are scanned by the workers, so visitors hear about vertices and levels only
+        on_discover, on_visit, _, on_level_end = visitor_hooks(visitor)
+        if on_discover:
+            on_discover(start_node, None, 0)
+
+        while size:
+            if on_visit:
+                for vertex in csr._names(frontier[:size]):
+                    on_visit(vertex, len(levels) - 1)
+
+            # split the frontier into chunks with about the same number of edges to scan
+            degrees = indptr[frontier[:size] + 1] - indptr[frontier[:size]]
+            load = np.cumsum(degrees)
+            if load[-1] == 0:
+                if on_level_end:
+                    on_level_end(len(levels) - 1, size, 0)
+                break
+
+            no_chunks = min(no_processes, size)
+            cuts = np.searchsorted(load, load[-1] * np.arange(1, no_chunks) / no_chunks, side="right")
+            bounds = np.unique(np.concatenate(([0], cuts, [size])))
+            tasks = [(specs, visited, int(a), int(b), int(load[a - 1]) if a else 0, len(levels) * no_processes + i)
+                     for i, (a, b) in enumerate(zip(bounds[:-1], bounds[1:]))]
+
+            # the chunks are already balanced, one task each
+            counts = executor.starmap(_expand_frontier, tasks, no_processes, chunksize=1)
+
+            # every chunk keeps the vertices whose tag it still holds
+            found = [scratch[offset:offset + count] for (_, _, _, _, offset, _), count in zip(tasks, counts)]
+            found = np.concatenate([chunk[visited.array[chunk] == task[-1]] for chunk, task in zip(found, tasks)])
+
+            if on_discover:
+                for vertex in csr._names(found):
+                    on_discover(vertex, None, len(levels))
+            if on_level_end:
+                on_level_end(len(levels) - 1, size, int(load[-1]))
+            size = len(found)
+            frontier[:size] = found
+            levels.append(found)
+
+        return csr._names(np.concatenate(levels))
+
+    finally:
+        release(blocks)
+        visited.close()
+
+
+def _has_csr(graph):
+    # whether parallel_bfs would find graph's CSR view already built; only looks
+    return isinstance(graph, CSRGraph) or (graph._csr is not None and graph._csr[0] == graph.version)
+
+
+def pbfs(graph, directed, weighted, start_node, visitor=None, parallel=None):
+    # parallel_bfs only beats bfs with more than one worker, and on a dict Graph only once the CSR conversion,
+    # about ten bfs runs of work, is paid for. parallel=None takes it when both hold: a CSRGraph, or a dict Graph
+    # whose csr_view is current, searches in parallel, any other dict Graph serially, and the choice never
+    # builds the view. parallel=True builds the view if needed and always takes parallel_bfs, False always bfs
+    if graph.get_degrees_of_vertex(start_node) is None:
+        return None
+
+    no_processes = cpu_count()
+    if parallel is None:
+        parallel = no_processes > 1 and _has_csr(graph)
+    if parallel:
+        return parallel_bfs(graph, start_node, no_processes, visitor)
+    return bfs(graph, start_node, visitor)
+
+
+def poolbfs(graph, directed, weighted, start_node, visitor=None):
+    # the worker pool search whatever the graph: pbfs with parallel=True, the first call on a dict Graph (and
+    # the first after each mutation) paying for its CSR view
+    return pbfs(graph, directed, weighted, start_node, visitor, parallel=True)
+
+
+def direction_optimizing_bfs(graph, start_node, alpha=14, beta=24, visitor=None):
+    out_degree = {vertex: graph.get_degrees_of_vertex(vertex)[1] for vertex in graph.get_vertices()}
+    unvisited = [vertex for vertex in out_degree if vertex != start_node]
+    unexplored_edges = sum(out_degree.values()) - out_degree[start_node]
+
+    visited = {start_node}
+    frontier = [start_node]
+    result = [start_node]
+    stats = []
+    top_down = True
+    on_discover, on_visit, on_edge, on_level_end = visitor_hooks(visitor)
+    if on_discover:
+        on_discover(start_node, None, 0)
+
+    while frontier:
+        if on_visit:
+            for vertex in frontier:
+                on_visit(vertex, len(stats))
+
+        # Beamer's heuristic: pull once the frontier has more edges than a fraction of the unexplored ones,
+        # push again once the frontier shrinks back to a small share of the vertices
+        frontier_edges = sum(out_degree[vertex] for vertex in frontier)
+        if top_down and frontier_edges > unexplored_edges / alpha:
+            top_down = False
+        elif not top_down and len(frontier) < len(out_degree) / beta:
+            top_down = True
+
+        edges = 0
+        next_frontier = []
+        if top_down:
+            for vertex in frontier:
+                for node in graph.get_out_neighbours(vertex):
+                    edges += 1
+                    if on_edge:
+                        on_edge(vertex, node)
+                    if node not in visited:
+                        visited.add(node)
+                        next_frontier.append(node)
+                        if on_discover:
+                            on_discover(node, vertex, len(stats) + 1)
+        else:
+            in_frontier = set(frontier)
+            for vertex in unvisited:
+                for parent in graph.get_in_neighbours(vertex):
+                    edges += 1
+                    if on_edge:
+                        on_edge(parent, vertex)
+                    if parent in in_frontier:
+                        next_frontier.append(vertex)
+                        if on_discover:
+                            on_discover(vertex, parent, len(stats) + 1)
+                        break
+            visited.update(next_frontier)
+
+        if on_level_end:
+            on_level_end(len(stats), len(frontier), edges)
+
+        stats.append({"level": len(stats), "frontier": len(frontier), "edges": edges,
+                      "direction": "top-down" if top_down else "bottom-up"})
+
+        if next_frontier:
+            unvisited = [vertex for vertex in unvisited if vertex not in visited]
+            unexplored_edges -= sum(out_degree[vertex] for vertex in next_frontier)
+        result.extend(next_frontier)
+        frontier = next_frontier
+
+    return result, stats
+
+
+def dfs_events(graph, vertex, visited=None, edges=False):
+    # yields (event, vertex, parent, depth) with event in "discover", "back" (edge to a vertex still on the stack)
+    # and "finish", and with edges also "edge" for every edge examined, before what it leads to; stop iterating
+    # to end the search early
+    visited = set() if visited is None else visited
+    visited.add(vertex)
+    active = {vertex}
+    yield "discover", vertex, None, 0
+
+    stack = [(vertex, None, iter(graph.get_out_neighbours(vertex)))]
+    while stack:
+        node, parent, neighbours = stack[-1]
+        for neighbour in neighbours:
+            if edges:
+                yield "edge", neighbour, node, len(stack)
             if neighbour not in visited:
-                dfs_util(graph, neighbour, visited, result)
+                visited.add(neighbour)
+                active.add(neighbour)
+                yield "discover", neighbour, node, len(stack)
+                stack.append((neighbour, node, iter(graph.get_out_neighbours(neighbour))))
+                break
+
+            if neighbour in active:
+                yield "back", neighbour, node, len(stack)
+        else:
+            stack.pop()
+            active.discard(node)
+            yield "finish", node, parent, len(stack)
 
-        return result
 
-    visited = set()
+def dfs(graph, vertex, visitor=None):
+    # depth plays the part of the level; a depth first search has no level ends to report
+    on_discover, on_visit, on_edge, _ = visitor_hooks(visitor)
+    if on_discover is None and on_visit is None and on_edge is None:
+        return [node for event, node, _, _ in dfs_events(graph, vertex) if event == "discover"]
+
     result = []
-    return dfs_util(graph, vertex, visited, result)
+    for event, node, parent, depth in dfs_events(graph, vertex, edges=on_edge is not None):
+        if event == "edge":
+            on_edge(parent, node)
+        elif event == "discover":
+            result.append(node)
+            if on_discover:
+                on_discover(node, parent, depth)
+            if on_visit:
+                on_visit(node, depth)
+    return result
 
 
-def read_from_file(name):
-    with open(name) as file:
-        lines = file.readlines()
-        edges_list = []
-        for line in lines:
-            split_line = line.strip().split(' ')
-            vertex1 = split_line[0]
-            vertex2 = split_line[1]
-            if len(split_line) > 2:
-                edges_list.append([int(vertex1), int(vertex2), int(split_line[2])])
+def find_cycle(graph):
+    visited = set()
+    for root in list(graph.get_vertices()):
+        if root in visited:
+            continue
+
+        path = []
+        for event, node, parent, depth in dfs_events(graph, root, visited):
+            if event == "discover":
+                del path[depth:]
+                path.append(node)
+            elif event == "back":
+                # parent is the top of the stack, at depth - 1; undirected, the edge back to its own parent is
+                # the tree edge it was reached by, not a cycle
+                if not graph.directed and depth >= 2 and path[depth - 2] == node:
+                    continue
+                del path[depth:]
+                return path[path.index(node):] + [node]
+
+    return None
+
+
+def topological_sort(graph):
+    # every undirected edge would be a back edge to its other end
+    if not graph.directed:
+        raise ValueError("A topological sort needs a directed graph.")
+
+    visited = set()
+    order = []
+    for root in list(graph.get_vertices()):
+        if root in visited:
+            continue
+
+        for event, node, _, _ in dfs_events(graph, root, visited):
+            if event == "finish":
+                order.append(node)
+            elif event == "back":
+                return None
+
+    order.reverse()
+    return order
+
+
+def strongly_connected_components(graph):
+    # Tarjan's algorithm with an explicit stack of (vertex, neighbour iterator) frames
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in list(graph.get_vertices()):
+        if root in index:
+            continue
+
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get_out_neighbours(root)))]
+
+        while work:
+            node, neighbours = work[-1]
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = low[neighbour] = len(index)
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(graph.get_out_neighbours(neighbour))))
+                    break
+
+                if neighbour in on_stack and index[neighbour] < low[node]:
+                    low[node] = index[neighbour]
             else:
-                edges_list.append([int(vertex1), int(vertex2), None])
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def _parse_edge_chunk(chunk):
+    if b"#" in chunk:
+        chunk = b"".join(line for line in chunk.splitlines(True) if not line.lstrip().startswith(b"#"))
+
+    buffer = np.frombuffer(chunk, dtype=np.uint8)
+    blank = buffer <= 32
+    first = ~blank & np.concatenate(([True], blank[:-1]))
+    last = ~blank & np.concatenate((blank[1:], [True]))
+    starts = np.flatnonzero(first)
+
+    # parse every integer token at once: digit * 10 ** (distance to the end of its token), summed per token
+    positions = np.flatnonzero(~blank)
+    characters = buffer[positions]
+    minus = characters == 45
+    if np.any(((characters < 48) | (characters > 57)) & ~minus):
+        raise ValueError(f"invalid edge list line in {chunk[:80]!r}")
+    digits = np.where(minus, 0, characters.astype(np.int64) - 48)
+    ends = np.flatnonzero(last)
+    power = ends[np.cumsum(first[positions]) - 1] - positions
+    lengths = ends - starts + 1
+    tokens = np.add.reduceat(digits * np.power(10, power, dtype=np.int64), np.cumsum(lengths) - lengths) \
+        if len(starts) else np.zeros(0, dtype=np.int64)
+    tokens[buffer[starts] == 45] *= -1
+
+    # number of tokens on every line, then keep the lines that hold at least an edge
+    counts = np.bincount(np.cumsum(buffer == 10)[starts], minlength=1)
+    offsets = np.cumsum(counts) - counts
+    lines = counts >= 2
+    counts, offsets = counts[lines], offsets[lines]
+
+    has_weight = counts > 2
+    weight = np.where(has_weight, tokens[np.minimum(offsets + 2, len(tokens) - 1)], 0) if len(offsets) else \
+        np.zeros(0, dtype=np.int64)
+    return tokens[offsets], tokens[offsets + 1], weight, has_weight
+
+
+def load_edge_arrays(name, chunk_size=1 << 24):
+    cache = name + ".npz"
+    stat = os.stat(name)
+    try:
+        with np.load(cache) as cached:
+            if int(cached["mtime"]) == stat.st_mtime_ns and int(cached["size"]) == stat.st_size:
+                return cached["src"], cached["dst"], cached["weight"], cached["has_weight"]
+    # a missing, stale or damaged cache (a truncated zip among them) is a miss and gets rewritten below
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        pass
+
+    parts = []
+    with open(name, "rb") as file:
+        rest = b""
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+
+            chunk = rest + chunk
+            end = chunk.rfind(b"\n") + 1
+            parts.append(_parse_edge_chunk(chunk[:end]))
+            rest = chunk[end:]
+
+        parts.append(_parse_edge_chunk(rest + b"\n"))
+
+    src, dst, weight, has_weight = (np.concatenate(column) for column in zip(*parts))
+
+    try:
+        with open(cache + ".tmp", "wb") as file:
+            np.savez(file, src=src, dst=dst, weight=weight, has_weight=has_weight,
+                     mtime=stat.st_mtime_ns, size=stat.st_size)
+        os.replace(cache + ".tmp", cache)
+    except OSError:
+        pass
+
+    return src, dst, weight, has_weight
+
 
-    return edges_list
+def read_from_file(name):
+    src, dst, weight, has_weight = load_edge_arrays(name)
+    weights = weight.tolist()
+    if not has_weight.all():
+        weights = [w if h else None for w, h in zip(weights, has_weight.tolist())]
+
+    return [list(edge) for edge in zip(src.tolist(), dst.tolist(), weights)]
 
 
 if __name__ == "__main__":
@@ -368,7 +1035,17 @@ if __name__ == "__main__":
         graph = Graph(edges_list, directed=True, weighted=False)
         # print(bfs(graph, 0))
         from timeit import timeit
-        print(timeit(lambda: poolbfs(graph, True, False, 0), number=10))
+
+        csr = CSRGraph(graph=graph)
+        print(f"bfs: {timeit(lambda: bfs(graph, 0), number=10)}")
+        print(f"bfs with an unused visitor: {timeit(lambda: bfs(graph, 0, Visitor()), number=10)}")
+        counters = Counters()
+        print(f"bfs with counters: {timeit(lambda: bfs(graph, 0, counters), number=1)}, {counters}")
+        with open(os.devnull, "w") as devnull:
+            print(f"bfs printing to devnull: {timeit(lambda: bfs(graph, 0, PrintVisitor(devnull)), number=10)}")
+        print(f"pbfs: {timeit(lambda: pbfs(graph, True, False, 0), number=10)}")
+        print(f"poolbfs: {timeit(lambda: poolbfs(graph, True, False, 0), number=10)}")
+        print(f"parallel_bfs on csr: {timeit(lambda: parallel_bfs(csr, 0), number=10)}")
         # print(pbfs(graph, True, False, 0))
         # print(graph.get_no_vertices())
         # print(graph.get_no_edges())
@@ -382,6 +1059,129 @@ if __name__ == "__main__":
         # print(graph.contract_edge([6, 319]))
         # print(graph.get_neighbours_of_vertex(6))
 
+    elif run == "csr":
+        import tracemalloc
+        from timeit import timeit
+
+        edges_list = read_from_file('facebook_combined.txt')
+        for backend in (Graph, CSRGraph):
+            tracemalloc.start()
+            graph = backend(edges_list, directed=True, weighted=False)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            bfs_time = timeit(lambda: bfs(graph, 0), number=10)
+            scan_time = timeit(lambda: [graph.get_neighbours_of_vertex(v) for v in graph.get_vertices()], number=10)
+            print(f"{backend.__name__}: {memory / 2 ** 20:.2f} MiB, bfs x10 {bfs_time:.3f}s, "
+                  f"neighbour scan x10 {scan_time:.3f}s")
+
+    elif run == "delete":
+        from timeit import default_timer
+
+        edges_list = read_from_file('facebook_combined.txt')
+        graph = Graph(edges_list, directed=True, weighted=False)
+        top = sorted(graph.get_vertices(), key=lambda v: sum(graph.get_degrees_of_vertex(v)), reverse=True)[:100]
+
+        start = default_timer()
+        for vertex in top:
+            graph.delete_vertex(vertex)
+        print(f"deleted {len(top)} vertices in {default_timer() - start:.3f}s, {graph.get_no_edges()} edges left")
+
+    elif run == "load":
+        from timeit import default_timer
+
+        if os.path.exists('facebook_combined.txt.npz'):
+            os.remove('facebook_combined.txt.npz')
+        for label in ("parse + write cache", "cached"):
+            start = default_timer()
+            load_edge_arrays('facebook_combined.txt')
+            print(f"load_edge_arrays ({label}): {default_timer() - start:.4f}s")
+        start = default_timer()
+        read_from_file('facebook_combined.txt')
+        print(f"read_from_file (cached): {default_timer() - start:.4f}s")
+
+    elif run == "batch":
+        from timeit import default_timer
+
+        edges_list = read_from_file('facebook_combined.txt')
+        for directed in (True, False):
+            start = default_timer()
+            graph = Graph([], directed=directed, weighted=False)
+            for edge in edges_list:
+                graph.add_edge(edge[0], edge[1], edge[2])
+            per_edge = default_timer() - start
+
+            start = default_timer()
+            bulk = Graph(edges_list, directed=directed, weighted=False)
+            print(f"directed={directed}: add_edge per edge {per_edge:.3f}s, bulk {default_timer() - start:.3f}s, "
+                  f"same graph {bulk.edges == graph.edges}")
+
+        operations = [("delete", *edge[:2]) if random.random() < 0.5 else
+                      ("add", random.randrange(4039), random.randrange(4039), None) for edge in edges_list]
+        graph = Graph(edges_list, directed=False, weighted=False)
+        start = default_timer()
+        for operation in operations:
+            if operation[0] == "add":
+                graph.add_edge(*operation[1:])
+            else:
+                graph.delete_edge(operation[1:])
+        per_edge = default_timer() - start
+
+        graph = Graph(edges_list, directed=False, weighted=False)
+        start = default_timer()
+        with graph.batch() as batch:
+            for operation in operations:
+                if operation[0] == "add":
+                    batch.add_edge(*operation[1:])
+                else:
+                    batch.delete_edge(operation[1:])
+        print(f"{len(operations)} mixed operations: per edge {per_edge:.3f}s, batch {default_timer() - start:.3f}s")
+
+    elif run == "dobfs":
+        from timeit import default_timer
+
+        graph = Graph.from_file('facebook_combined.txt', directed=False, weighted=False)
+        for source in (0, 107, 1684, 3437, 4000):
+            start = default_timer()
+            result, stats = direction_optimizing_bfs(graph, source)
+            elapsed = default_timer() - start
+            # a plain bfs scans every out-edge of every vertex it reaches
+            plain_edges = sum(graph.get_degrees_of_vertex(vertex)[1] for vertex in result)
+            edges = sum(level["edges"] for level in stats)
+            print(f"source {source}: {edges} edges examined vs {plain_edges} for bfs "
+                  f"({plain_edges / edges:.1f}x fewer), {elapsed:.3f}s")
+            for level in stats:
+                print(f"    {level}")
+
+    elif run == "dfs":
+        from timeit import default_timer
+
+        graph = Graph.from_file('facebook_combined.txt', directed=True, weighted=False)
+        chain = Graph([[vertex, vertex + 1, None] for vertex in range(100000)], directed=True, weighted=False)
+        for name, function, target, budget in (("dfs", lambda g: dfs(g, 0), graph, 0.5),
+                                               ("topological_sort", topological_sort, graph, 1.0),
+                                               ("find_cycle", find_cycle, graph, 1.0),
+                                               ("strongly_connected_components", strongly_connected_components, graph, 1.0),
+                                               ("dfs on a 100000 vertex chain", lambda g: dfs(g, 0), chain, 2.0)):
+            start = default_timer()
+            result = function(target)
+            elapsed = default_timer() - start
+            size = len(result) if result is not None else None
+            print(f"{name}: {elapsed:.3f}s (budget {budget}s, {'ok' if elapsed <= budget else 'over'}), size {size}")
+
+    elif run == "spawn":
+        # under spawn the workers only share the visit tag locks the pool initializer hands them, and two
+        # chunks claiming the same vertex would show up as a different order than the serial bfs
+        from multiprocessing import set_start_method
+
+        set_start_method("spawn")
+        graph = Graph.from_file('facebook_combined.txt', directed=True, weighted=False)
+        csr = CSRGraph(graph=graph)
+        for no_processes in (1, 2, 3, 5):
+            for source in (0, 107, 1684, 3437):
+                assert parallel_bfs(csr, source, no_processes) == bfs(graph, source), (no_processes, source)
+        print("parallel_bfs matches bfs under spawn")
+
     elif run == "test":
         edges_list = read_from_file('input.txt')
         graph = Graph(edges_list, directed=True, weighted=False)
@@ -1,71 +1,87 @@
-from collections import namedtuple
-import matplotlib.pyplot as plt
-import networkx as nx
-import random
+from collections import namedtuple, deque
+from laborator1 import read_from_file, visitor_hooks
+import layout
 
 
 Edge = namedtuple('Edge', ['frm', 'to', 'weight'])
-Vertex = namedtuple('Vertex', ['name', 'nlist', 'parent', 'visited'])
+
+
+class Vertex:
+   # mutable record so traversals can update parent and visited in place
+   __slots__ = ('name', 'nlist', 'parent', 'visited')
+
+   def __init__(self, name, nlist, parent, visited):
+      self.name = name
+      self.nlist = nlist
+      self.parent = parent
+      self.visited = visited
+
+   def __iter__(self):
+      return iter((self.name, self.nlist, self.parent, self.visited))
+
+   def __repr__(self):
+      return f"Vertex(name={self.name!r}, nlist={self.nlist!r}, parent={self.parent!r}, visited={self.visited!r})"
 
 
 class Graph:
    
    def __init__(self, edges_list=None, directed=True, weighted=True):
 
-      self.edges = []
-      self.vertices = []
+      # name -> Vertex and (frm, to) -> weight, both kept in insertion order;
+      # Edge records are only built when an edge is looked up
+      self.edges = {}
+      self.vertices = {}
       self.directed = directed
       self.weighted = weighted
 
       for edge in edges_list:
-         self.edges.append(Edge(edge[0], edge[1], edge[2] if weighted else None))
+         self.edges.setdefault((edge[0], edge[1]), edge[2] if weighted else None)
 
-      for edge in self.edges:
-         self.add_vertex(edge.frm)
-         self.add_vertex(edge.to)
-         self.add_neighbour_to_vertex(edge.frm, edge.to)
+      for frm, to in self.edges:
+         self.add_vertex(frm)
+         self.add_vertex(to)
+         self.add_neighbour_to_vertex(frm, to)
          if not self.directed:
-            self.add_neighbour_to_vertex(edge.to, edge.frm)
+            self.add_neighbour_to_vertex(to, frm)
+
+   @classmethod
+   def from_file(cls, name, directed=True, weighted=True):
+      return cls(read_from_file(name), directed=directed, weighted=weighted)
 
    def get_vertex_by_name(self, name):
-      for vertex in self.vertices:
-         if vertex.name == name:
-            return vertex
+      if name in self.vertices:
+         return self.vertices[name]
          
       print(f"Vertex {name} does not exist")
       return None
    
    def get_edge_by_name(self, name):
-      for edge in self.edges:
-         if edge.frm == name[0] and edge.to == name[1]:
-            return edge
+      if (name[0], name[1]) in self.edges:
+         return Edge(name[0], name[1], self.edges[(name[0], name[1])])
          
       print(f"Edge {name} does not exist")
       return None
 
+   # the mutators report misses through their return value instead of printing
    def add_neighbour_to_vertex(self, neighbour_name, vertex_name):
-      if vertex_name not in self.get_vertices():
-         print(f"Vertex {vertex_name} does not exist")
-
-      if neighbour_name not in self.get_vertices():
-         print(f"Vertex {neighbour_name} does not exist")
-
-      vertex = self.get_vertex_by_name(vertex_name)
+      if vertex_name not in self.vertices or neighbour_name not in self.vertices:
+         return False
 
+      vertex = self.vertices[vertex_name]
       if neighbour_name not in vertex.nlist:
          vertex.nlist.append(neighbour_name)
+      return True
 
    def get_vertices(self):
-      return [vertex.name for vertex in self.vertices]
+      return list(self.vertices)
    
    def get_edges(self):
-      return [[edge.frm, edge.to] for edge in self.edges]
+      return [[frm, to] for frm, to in self.edges]
    
    def get_weight_of_edge(self, edge_name):
       if self.weighted:
-         for edge in self.edges:
-            if edge.frm == edge_name[0] and edge.to == edge_name[1]:
-               return edge.weight
+         if (edge_name[0], edge_name[1]) in self.edges:
+            return self.edges[(edge_name[0], edge_name[1])]
 
          else:
             print(f"Edge {edge_name} does not exist")
@@ -77,19 +93,19 @@ class Graph:
       if self.weighted and weight is None:
          weight = 0
       
-      if [vertex1_name, vertex2_name] not in self.get_edges() and [vertex2_name, vertex1_name] not in self.get_edges():
+      if (vertex1_name, vertex2_name) not in self.edges and (vertex2_name, vertex1_name) not in self.edges:
          if vertex1_name < vertex2_name:
-            self.edges.append(Edge(vertex1_name, vertex2_name, weight))
+            self.edges[(vertex1_name, vertex2_name)] = weight
          else:
-            self.edges.append(Edge(vertex2_name, vertex1_name, weight))
+            self.edges[(vertex2_name, vertex1_name)] = weight
             
          self.add_neighbour_to_vertex(vertex1_name, vertex2_name)
          if not self.directed:
             self.add_neighbour_to_vertex(vertex2_name, vertex1_name)
 
    def add_vertex(self, vertex_name):
-      if vertex_name not in self.get_vertices():
-         self.vertices.append(Vertex(vertex_name, [], None, False))
+      if vertex_name not in self.vertices:
+         self.vertices[vertex_name] = Vertex(vertex_name, [], None, False)
 
    def get_no_vertices(self):
       return len(self.vertices)
@@ -98,14 +114,14 @@ class Graph:
       return len(self.edges)
    
    def get_degree_of_vertex(self, vertex_name):
-      if vertex_name in self.get_vertices():
-         return len(self.get_vertex_by_name(vertex_name).nlist)
+      if vertex_name in self.vertices:
+         return len(self.vertices[vertex_name].nlist)
       else:
          print(f"Vertex {vertex_name} does not exist")
    
    def get_neighbours_of_vertex(self, vertex_name):
-      if vertex_name in self.get_vertices():
-         return self.get_vertex_by_name(vertex_name).nlist
+      if vertex_name in self.vertices:
+         return self.vertices[vertex_name].nlist
       else:
          print(f"Vertex {vertex_name} does not exist")
 
@@ -113,128 +129,167 @@ class Graph:
       if vertex1_name in self.get_neighbours_of_vertex(vertex2_name) or vertex2_name in self.get_neighbours_of_vertex(vertex1_name):
          return True
       return False
-   
+
+   def _incident_edges(self, vertex_name):
+      # nlist only records incoming neighbours of a directed graph, so outgoing edges need a scan
+      if self.directed:
+         return [key for key in self.edges if vertex_name in key]
+
+      # a self loop is in both halves, it is listed once
+      keys = [(vertex_name, name) for name in self.vertices[vertex_name].nlist] + \
+             [(name, vertex_name) for name in self.vertices[vertex_name].nlist if name != vertex_name]
+      return [key for key in keys if key in self.edges]
+
+   def _remove_neighbour(self, vertex_name, neighbour_name):
+      nlist = self.vertices[vertex_name].nlist
+      if neighbour_name in nlist:
+         nlist.remove(neighbour_name)
+
    def delete_vertex(self, vertex_name):
-      if vertex_name in self.get_vertices():
-         vertex = self.get_vertex_by_name(vertex_name)
-         neighbours = vertex.nlist
-         self.vertices.pop(vertex)
-
-         for neighbor_name in neighbours:
-            neighbor = self.get_neighbor_by_name(neighbor_name)
-            neighbor.nlist.remove(vertex_name)
-      
-      else:
-         print(f"Vertex {vertex_name} does not exist")
+      if vertex_name in self.vertices:
+         for key in self._incident_edges(vertex_name):
+            self.edges.pop(key)
+            other = key[1] if key[0] == vertex_name else key[0]
+            if other != vertex_name:
+               self._remove_neighbour(other, vertex_name)
+
+         return self.vertices.pop(vertex_name).name
+
+      return None
    
    def delete_edge(self, edge_name):
-      if edge_name in self.get_edges():
-         self.get_vertex_by_name(edge_name[0]).nlist.remove(edge_name[1])
+      if (edge_name[0], edge_name[1]) in self.edges:
+         self._remove_neighbour(edge_name[1], edge_name[0])
 
          if not self.directed:
-            self.get_vertex_by_name(edge_name[1]).nlist.remove(edge_name[0])
+            self._remove_neighbour(edge_name[0], edge_name[1])
 
-         self.edges.remove(self.get_edge_by_name(edge_name))
-         print(f"Edge {edge_name} was deleted")
-         
-      else:
-         print(f"Edge {edge_name} does not exist")
+         return Edge(edge_name[0], edge_name[1], self.edges.pop((edge_name[0], edge_name[1])))
 
-   def contract_edge(self, edge_name):
-      if edge_name in self.get_edges():
-         self.edges.remove(self.get_edge_by_name(edge_name))
-         vertex2_neighbours = self.get_vertex_by_name(edge_name[1]).nlist
-         for vertex_name in vertex2_neighbours:
-            if vertex_name not in self.get_vertex_by_name(edge_name[0]).nlist and vertex_name != edge_name[0]:
-               self.get_vertex_by_name(edge_name[0]).nlist.append(vertex_name)
-
-               if edge_name[0] < vertex_name:
-                  self.edges.append(Edge(edge_name[0], vertex_name, edge_name[2] if self.weighted else None))
-               else:
-                  self.edges.append(Edge(vertex_name, edge_name[0], edge_name[2] if self.weighted else None))
-            
-            if [vertex_name, edge_name[1]] in self.get_edges() and vertex_name != edge_name[0]:
-               self.edges.remove(self.get_edge_by_name([vertex_name, edge_name[1]]))
-
-            if [edge_name[1], vertex_name] in self.get_edges() and vertex_name != edge_name[0]:
-               self.edges.remove(self.get_edge_by_name([edge_name[1], vertex_name]))
+      return None
 
-         self.get_vertex_by_name(edge_name[0]).nlist.remove(edge_name[1])
-         self.vertices.pop(self.get_vertex_by_name(edge_name[1]))
+   def contract_edge(self, edge_name):
+      if (edge_name[0], edge_name[1]) in self.edges:
+         weight = self.edges.pop((edge_name[0], edge_name[1]))
+         vertex1 = self.vertices[edge_name[0]]
+
+         for key in self._incident_edges(edge_name[1]):
+            self.edges.pop(key)
+            vertex_name = key[1] if key[0] == edge_name[1] else key[0]
+            if vertex_name == edge_name[0] or vertex_name == edge_name[1]:
+               continue
+
+            self._remove_neighbour(vertex_name, edge_name[1])
+            if vertex_name not in vertex1.nlist:
+               vertex1.nlist.append(vertex_name)
+               if not self.directed:
+                  self.vertices[vertex_name].nlist.append(edge_name[0])
+
+            if edge_name[0] < vertex_name:
+               self.edges.setdefault((edge_name[0], vertex_name), weight)
+            else:
+               self.edges.setdefault((vertex_name, edge_name[0]), weight)
+
+         self._remove_neighbour(edge_name[0], edge_name[1])
+         self.vertices.pop(edge_name[1])
+         return Edge(edge_name[0], edge_name[1], weight)
 
-      else:
-         print(f"Edge {edge_name} does not exist")
-
-   def draw_graph(self, specific_vertex=None):
-      G=nx.Graph()
-      pos = {}
-      used_pos_x = []
-      used_pos_y = []
-
-      if specific_vertex is None:
-         for vertex in self.get_vertices():
-            G.add_node(str(vertex))
-
-            x = random.uniform(1, 10000000000)
-            while x in used_pos_x:
-               x = round( random.uniform(1, 10000000000), 1)
-            y = random.uniform(1, 10000000000)
-            while y in used_pos_y:
-               y = round( random.rand(1, 10000000000), 1)
-
-            pos[str(vertex)] = (x, y)
-            used_pos_x.append(x)
-            used_pos_y.append(y)
-
-
-         for edge in self.get_edges:
-            G.add_edge(str(edge[0]), str(edge[1]))
-
-      elif specific_vertex in self.get_vertices():
-         G.add_node(str(specific_vertex))
-         x = random.uniform(1, 10000000000)
-         y = random.uniform(1, 10000000000)
-         used_pos_x.append(x)
-         used_pos_y.append(y)
-         pos[str(specific_vertex)] = (x, y)
-
-         for vertex in self.get_vertex_by_name(specific_vertex).nlist:
-            G.add_node(str(vertex))
-            G.add_edge(str(specific_vertex), str(vertex))
-
-            while x in used_pos_x:
-               x = round( random.uniform(1, 10000000000), 1)
-            while y in used_pos_y:
-               y = round( random.uniform(1, 10000000000), 1)
-
-            pos[str(vertex)] = (x, y)
-            used_pos_x.append(x)
-            used_pos_y.append(y)
-      
-      else:
-         print(f"Vertex {specific_vertex} does not exist")
+      return None
 
-      
-      nx.draw(G,pos=pos,with_labels=True,node_color="red",node_size=1000,font_color="white",font_size=20,font_family="Times New Roman", font_weight="bold",width=3,edge_color="black")
-      plt.margins(0.2)
-      plt.show()
+   def _successors(self):
+      # name -> the vertices its edges lead to; nlist holds the incoming neighbours of a directed graph, so
+      # there they are inverted once per traversal
+      if not self.directed:
+         return {name: vertex.nlist for name, vertex in self.vertices.items()}
+
+      successors = {name: [] for name in self.vertices}
+      for name, vertex in self.vertices.items():
+         for neighbour_name in vertex.nlist:
+            successors[neighbour_name].append(name)
+      return successors
+
+   def bfs(self, start_name, visitor=None):
+      for vertex in self.vertices.values():
+         vertex.parent = None
+         vertex.visited = False
+
+      start = self.vertices.get(start_name)
+      if start is None:
+         return None
+
+      start.visited = True
+      successors = self._successors()
+      if visitor is not None:
+         return self._visited_bfs(start, successors, visitor_hooks(visitor))
+
+      queue = deque([start])
+      result = []
+      while queue:
+         vertex = queue.popleft()
+         result.append(vertex.name)
+         for neighbour_name in successors[vertex.name]:
+            neighbour = self.vertices[neighbour_name]
+            if not neighbour.visited:
+               neighbour.visited = True
+               neighbour.parent = vertex.name
+               queue.append(neighbour)
+
+      return result
+
+   def _visited_bfs(self, start, successors, hooks):
+      # level by level so the visitor sees where each level ends; visits in the same order as bfs
+      on_discover, on_visit, on_edge, on_level_end = hooks
+      if on_discover:
+         on_discover(start.name, None, 0)
+
+      frontier = [start]
+      result = []
+      level = 0
+      while frontier:
+         next_frontier = []
+         edges = 0
+         for vertex in frontier:
+            result.append(vertex.name)
+            if on_visit:
+               on_visit(vertex.name, level)
+            neighbours = successors[vertex.name]
+            edges += len(neighbours)
+            for neighbour_name in neighbours:
+               if on_edge:
+                  on_edge(vertex.name, neighbour_name)
+               neighbour = self.vertices[neighbour_name]
+               if not neighbour.visited:
+                  neighbour.visited = True
+                  neighbour.parent = vertex.name
+                  next_frontier.append(neighbour)
+                  if on_discover:
+                     on_discover(neighbour_name, vertex.name, level + 1)
+
+         if on_level_end:
+            on_level_end(level, len(frontier), edges)
+         frontier = next_frontier
+         level += 1
+
+      return result
+
+   def draw_graph(self, specific_vertex=None, **options):
+      return layout.draw_graph(self, specific_vertex, **options)
 
 
 if __name__ == "__main__":
-   # with open('input.txt') as file:
-   with open('facebook_combined.txt') as file:
-      lines = file.readlines()
-      edges_list = []
-      for line in lines:
-         vertex1 = line.strip().split(' ')[0]
-         vertex2 = line.strip().split(' ')[1]
-         if len(line.strip().split(' ')) > 2:
-            weight = int(line.strip().split(' ')[2])
-         else:
-            weight = None
-         edges_list.append([int(vertex1), int(vertex2), weight])
+   from timeit import default_timer
+   import tracemalloc
+
+   # edges_list = read_from_file('input.txt')
+   edges_list = read_from_file('facebook_combined.txt')
 
+   tracemalloc.start()
+   start = default_timer()
    graph = Graph(edges_list, directed=True, weighted=True)
+   print("constructed in", round(default_timer() - start, 3), "s")
+   print("memory", tracemalloc.get_traced_memory()[0], "bytes,",
+         round(tracemalloc.get_traced_memory()[0] / (graph.get_no_vertices() + graph.get_no_edges()), 1), "per record")
+   tracemalloc.stop()
    print("get_vertices()", graph.get_vertices())
    print("get_edges()", graph.get_edges())
    print("get_no_vertices()", graph.get_no_vertices())
@@ -242,6 +297,10 @@ if __name__ == "__main__":
    print("get_degree_of_vertex(3926)", graph.get_degree_of_vertex(3926))
    print("get_neighbours_of_vertex(3926)", graph.get_neighbours_of_vertex(3926))
    print("check_if_vertices_are_neighbours(0, 1)", graph.check_if_vertices_are_neighbours(0, 1))
+   # bfs follows the edges of a directed graph forward
+   chain = Graph([[1, 2, None], [2, 3, None]], directed=True, weighted=False)
+   print("directed 1 -> 2 -> 3: bfs(1)", chain.bfs(1), "bfs(3)", chain.bfs(3))
+   assert chain.bfs(1) == [1, 2, 3] and chain.bfs(3) == [3]
    graph.contract_edge([0, 1])
    print("check_if_vertices_are_neighbours(0, 1)", graph.check_if_vertices_are_neighbours(0, 1))
    print("check_if_vertices_are_neighbours(0, 2345)", graph.check_if_vertices_are_neighbours(0, 2345))
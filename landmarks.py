@@ -0,0 +1,178 @@
+import heapq
+import numpy as np
+from a_star import neighbours_functions
+
+
+def vertex_names(graph):
+    return list(graph.get_vertices()) if hasattr(graph, 'get_vertices') else list(graph.vertices)
+
+
+def shortest_distances(graph, source, neighbours, index):
+    # Dijkstra from source over neighbours(vertex) -> [(neighbour, weight)], as an array in index order
+    distances = np.full(len(index), np.inf)
+    distances[index[source]] = 0
+    open_set = [(0, source)]
+    closed_set = set()
+
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if current in closed_set:
+            continue
+
+        closed_set.add(current)
+        for neighbor, weight in neighbours(current):
+            if distance + weight < distances[index[neighbor]]:
+                distances[index[neighbor]] = distance + weight
+                heapq.heappush(open_set, (distance + weight, neighbor))
+
+    return distances
+
+
+class Landmarks:
+
+    def __init__(self, names, landmarks, distances_from, distances_to):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.landmarks = landmarks
+        # (k, n) tables: distances_from[l, v] = d(landmark l, v), distances_to[l, v] = d(v, landmark l)
+        self.distances_from = distances_from
+        self.distances_to = distances_to
+        # a narrower dtype rounds every stored distance by up to half a spacing and the difference of two by
+        # another half, so a bound can be off by one and a half; the bounds give up two to stay admissible
+        finite = [table[np.isfinite(table)] for table in (distances_from, distances_to)]
+        largest = max((float(values.max()) for values in finite if len(values)), default=0.0)
+        dtype = distances_from.dtype
+        self.slack = 0.0 if dtype == np.float64 else 2 * float(np.spacing(dtype.type(largest)))
+        self.cache = {}
+
+    @classmethod
+    def build(cls, graph, k=8, method="farthest", dtype=np.float64):
+        # float32 halves the tables but only stores distances below 2 ** 24 exactly; past that the bounds
+        # lose the rounding slack and get weaker
+        names = vertex_names(graph)
+        index = {name: i for i, name in enumerate(names)}
+        forward, backward = neighbours_functions(graph)
+        symmetric = forward is backward
+
+        def trees(landmark):
+            distances_from = shortest_distances(graph, landmark, forward, index)
+            distances_to = distances_from if symmetric else shortest_distances(graph, landmark, backward, index)
+            return distances_from, distances_to
+
+        if method == "degree":
+            degrees = [len(forward(name)) + (0 if symmetric else len(backward(name))) for name in names]
+            landmarks = [int(i) for i in np.argsort(degrees, kind="stable")[::-1][:k]]
+            tables = [trees(names[i]) for i in landmarks]
+
+        elif method == "farthest":
+            # start from the vertex farthest from an arbitrary one, then keep adding the vertex whose
+            # distance to the closest chosen landmark is the largest (unreachable vertices go first)
+            first = trees(names[0])[0]
+            landmarks = [int(np.argmax(np.where(np.isinf(first), -1, first)))]
+            tables = [trees(names[landmarks[0]])]
+            closest = np.minimum(tables[0][0], tables[0][1])
+            while len(landmarks) < min(k, len(names)):
+                closest[landmarks] = -1
+                landmarks.append(int(np.argmax(closest)))
+                tables.append(trees(names[landmarks[-1]]))
+                closest = np.minimum(closest, np.minimum(tables[-1][0], tables[-1][1]))
+
+        else:
+            raise ValueError(f"Unknown landmark selection method {method}.")
+
+        distances_from = np.array([table[0] for table in tables], dtype=dtype)
+        distances_to = distances_from if symmetric else np.array([table[1] for table in tables], dtype=dtype)
+        return cls(names, np.array(landmarks, dtype=np.int64), distances_from, distances_to)
+
+    def save(self, name):
+        with open(name, "wb") as file:
+            np.savez(file, landmarks=self.landmarks, distances_from=self.distances_from,
+                     distances_to=self.distances_to, symmetric=self.distances_to is self.distances_from)
+
+    @classmethod
+    def load(cls, name, graph):
+        # the tables are stored in the vertex order of graph, which is how they were built
+        names = vertex_names(graph)
+        with np.load(name) as data:
+            distances_from = data["distances_from"]
+            distances_to = distances_from if data["symmetric"] else data["distances_to"]
+            if distances_from.shape[1] != len(names):
+                raise ValueError(f"{name} was built for a graph with {distances_from.shape[1]} vertices, "
+                                 f"not {len(names)}.")
+            return cls(names, data["landmarks"], distances_from, distances_to)
+
+    def lower_bounds(self, vertex, towards=True):
+        # ALT lower bounds for every vertex u of d(u, vertex) (towards=True) or of d(vertex, u), by the
+        # triangle inequality d(u, t) >= d(l, t) - d(l, u) and d(u, t) >= d(u, l) - d(t, l)
+        i = self.index[vertex]
+        with np.errstate(invalid="ignore"):
+            if towards:
+                bounds = np.maximum(self.distances_from[:, i, None] - self.distances_from,
+                                    self.distances_to - self.distances_to[:, i, None])
+            else:
+                bounds = np.maximum(self.distances_from - self.distances_from[:, i, None],
+                                    self.distances_to[:, i, None] - self.distances_to)
+            bounds = bounds.max(axis=0) if len(bounds) else np.zeros(len(self.names))
+
+        bounds = bounds - self.slack
+        return np.where(np.isfinite(bounds) & (bounds > 0), bounds, 0).tolist()
+
+    def heuristic(self, u, v):
+        # astar calls this with a fixed goal v and bidirectional_astar also with a fixed start u,
+        # so the bounds towards v and from u are computed once and then only indexed
+        if ("to", v) in self.cache:
+            return self.cache[("to", v)][self.index[u]]
+        if ("from", u) in self.cache:
+            return self.cache[("from", u)][self.index[v]]
+
+        if len(self.cache) >= 8:
+            self.cache.clear()
+        self.cache[("from", u)] = self.lower_bounds(u, towards=False)
+        self.cache[("to", v)] = self.lower_bounds(v, towards=True)
+        return self.cache[("to", v)][self.index[u]]
+
+    def __call__(self, u, v):
+        return self.heuristic(u, v)
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    from timeit import default_timer
+    from a_star import Graph, astar, bidirectional_astar, grid_graph
+    from laborator1 import read_from_file
+
+    facebook = Graph()
+    for edge in read_from_file("facebook_combined.txt"):
+        for vertex in edge[:2]:
+            if vertex not in facebook.vertices:
+                facebook.add_vertex(vertex, 0)
+        facebook.add_edge(edge[0], edge[1], 1)
+
+    grid = grid_graph(200, 200, (0, 0))
+    for vertex in grid.vertices:
+        grid.vertices[vertex]['heuristic'] = 0
+
+    for label, graph in (("facebook", facebook), ("200x200 grid", grid)):
+        begin = default_timer()
+        landmarks = Landmarks.build(graph, k=8)
+        print(f"{label}: 8 farthest landmarks in {default_timer() - begin:.3f}s, "
+              f"{landmarks.distances_from.nbytes} bytes of tables")
+
+        path = os.path.join(tempfile.mkdtemp(), "landmarks.npz")
+        landmarks.save(path)
+        landmarks = Landmarks.load(path, graph)
+
+        rng = random.Random(0)
+        names = vertex_names(graph)
+        queries = [tuple(rng.sample(names, 2)) for _ in range(50)]
+        for name, search, heuristic in (("astar, no heuristic", astar, None),
+                                        ("astar, ALT", astar, landmarks),
+                                        ("bidirectional, no heuristic", bidirectional_astar, None),
+                                        ("bidirectional, ALT", bidirectional_astar, landmarks)):
+            begin = default_timer()
+            results = [search(graph, s, t, heuristic) for s, t in queries]
+            elapsed = default_timer() - begin
+            print(f"    {name}: {sum(result[2] for result in results) / len(queries):.0f} expanded per query, "
+                  f"{1000 * elapsed / len(queries):.2f} ms per query, total cost {sum(result[1] for result in results)}")
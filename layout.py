@@ -0,0 +1,222 @@
+import numpy as np
+from analytics import arc_arrays
+
+# matplotlib is imported by the functions that draw, so the graph modules that import this one stay headless
+
+# vertices per grid cell the repulsion grid aims for
+CELL_SIZE = 16
+# graphs up to this many vertices get the old labelled look
+LABELLED = 50
+
+
+def _repulsion(positions, k):
+    # Fruchterman-Reingold repulsion k^2 / d on a uniform grid: exact between vertices in neighbouring cells,
+    # every farther cell acts as one point of its vertex count at its centre of mass
+    n = len(positions)
+    side = max(1, int(np.sqrt(n / CELL_SIZE)))
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-12)
+    cells_xy = np.minimum((positions - low) / span * side, side - 1).astype(np.int64)
+    cells = cells_xy[:, 0] * side + cells_xy[:, 1]
+
+    counts = np.bincount(cells, minlength=side * side)
+    occupied = np.flatnonzero(counts)
+    centres = np.stack([np.bincount(cells, positions[:, 0], side * side),
+                        np.bincount(cells, positions[:, 1], side * side)], axis=1)[occupied] / counts[occupied, None]
+
+    x, y = positions[:, 0], positions[:, 1]
+    distances = np.square(x[:, None] - centres[None, :, 0])
+    distances += np.square(y[:, None] - centres[None, :, 1])
+    strength = np.divide(counts[occupied] * k * k, np.maximum(distances, 1e-12, out=distances), out=distances)
+    near = np.abs(cells_xy[:, 0, None] - (occupied // side)[None, :]) <= 1
+    near &= np.abs(cells_xy[:, 1, None] - (occupied % side)[None, :]) <= 1
+    strength[near] = 0
+    # sum over j of (p_i - c_j) w_ij is p_i sum_j w_ij - (W c)_i, a matrix product instead of a 3-d sum
+    displacement = positions * strength.sum(axis=1)[:, None] - strength @ centres
+
+    order = np.argsort(cells, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    for cell in occupied.tolist():
+        row, column = divmod(cell, side)
+        low_y, high_y = max(0, column - 1), min(side, column + 2)
+        # the 3x3 block is three runs of consecutive cell ids
+        block = np.concatenate([order[starts[r * side + low_y]:starts[r * side + high_y]]
+                                for r in range(max(0, row - 1), min(side, row + 2))])
+        members = order[starts[cell]:starts[cell + 1]]
+        dx, dy = x[members, None] - x[None, block], y[members, None] - y[None, block]
+        distances = dx * dx + dy * dy
+        # the vertex itself (and exact duplicates) push nothing
+        distances[distances == 0] = np.inf
+        strength = k * k / distances
+        displacement[members] += positions[members] * strength.sum(axis=1)[:, None] - strength @ positions[block]
+
+    return displacement
+
+
+def force_layout(n, src, dst, iterations=50, seed=0, positions=None, fixed=None):
+    # (n, 2) positions in the unit square; src, dst are the arcs pulling their ends together and fixed the
+    # vertices that keep their starting position
+    rng = np.random.default_rng(seed)
+    positions = rng.random((n, 2)) if positions is None else np.array(positions, dtype=np.float64)
+    if n < 2:
+        return positions
+
+    k = np.sqrt(1.0 / n)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = _repulsion(positions, k)
+
+        delta = positions[src] - positions[dst]
+        pull = delta * (np.hypot(delta[:, 0], delta[:, 1]) / k)[:, None]
+        for axis in (0, 1):
+            displacement[:, axis] += np.bincount(dst, pull[:, axis], n) - np.bincount(src, pull[:, axis], n)
+
+        if fixed is not None:
+            displacement[fixed] = 0
+        length = np.maximum(np.hypot(displacement[:, 0], displacement[:, 1]), 1e-12)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    low = positions.min(axis=0)
+    return (positions - low) / max((positions.max(axis=0) - low).max(), 1e-12)
+
+
+def simple_pairs(src, dst):
+    # one (u, v) per connected pair, self loops dropped, so undirected edges are drawn once
+    low, high = np.minimum(src, dst), np.maximum(src, dst)
+    keep = low != high
+    pairs = np.unique(np.stack([low[keep], high[keep]], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def level_of_detail(n, src, dst, max_vertices=5000, max_edges=100000, seed=0):
+    # the max_vertices vertices of highest degree and at most max_edges of the edges between them,
+    # as (kept vertex ids, src, dst) with src and dst renumbered to positions in the kept ids
+    if n > max_vertices:
+        degrees = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+        kept = np.sort(np.argsort(-degrees, kind="stable")[:max_vertices])
+    else:
+        kept = np.arange(n)
+
+    index = np.full(n, -1, dtype=np.int64)
+    index[kept] = np.arange(len(kept))
+    inside = (index[src] >= 0) & (index[dst] >= 0)
+    src, dst = index[src[inside]], index[dst[inside]]
+    if len(src) > max_edges:
+        chosen = np.sort(np.random.default_rng(seed).choice(len(src), max_edges, replace=False))
+        src, dst = src[chosen], dst[chosen]
+    return kept, src, dst
+
+
+def ego_network(n, src, dst, centre, radius=1):
+    # vertices within radius hops of centre in either direction, centre first, and the edges between them
+    reached = np.zeros(n, dtype=bool)
+    reached[centre] = True
+    for _ in range(radius):
+        reached[dst[reached[src]]] = True
+        reached[src[reached[dst]]] = True
+
+    kept = np.concatenate([[centre], np.flatnonzero(reached & (np.arange(n) != centre))])
+    index = np.full(n, -1, dtype=np.int64)
+    index[kept] = np.arange(len(kept))
+    inside = (index[src] >= 0) & (index[dst] >= 0)
+    return kept, index[src[inside]], index[dst[inside]]
+
+
+def render(labels, positions, src, dst, ax=None, highlight=None):
+    # edges as one LineCollection and vertices as one scatter; labels only on small drawings
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    ax = plt.gca() if ax is None else ax
+    n = len(positions)
+    small = n <= LABELLED
+    width = 3 if small else max(0.1, min(1.0, 300 / max(len(src), 1) ** 0.5))
+    ax.add_collection(LineCollection(np.stack([positions[src], positions[dst]], axis=1), colors="black",
+                                     linewidths=width, alpha=1.0 if small else 0.3, zorder=1))
+
+    colors = np.array(["red"] * n, dtype=object)
+    if highlight is not None:
+        colors[highlight] = "blue"
+    ax.scatter(positions[:, 0], positions[:, 1], s=500 if small else max(2.0, min(100.0, 20000 / max(n, 1))),
+               c=list(colors), zorder=2)
+    if small:
+        for label, (x, y) in zip(labels, positions.tolist()):
+            ax.annotate(str(label), (x, y), ha="center", va="center", color="white", fontsize=20,
+                        fontfamily="Times New Roman", fontweight="bold", zorder=3)
+
+    ax.autoscale()
+    ax.margins(0.2 if small else 0.02)
+    ax.set_axis_off()
+    return ax
+
+
+def draw_graph(graph, specific_vertex=None, radius=1, max_vertices=5000, max_edges=100000, iterations=50, seed=0,
+               show=True):
+    # force directed drawing of a laborator1 or laborator2 Graph, or only the radius hop neighbourhood of
+    # specific_vertex; returns {vertex: (x, y)} of the drawn vertices
+    import matplotlib.pyplot as plt
+
+    names, src, dst = arc_arrays(graph)
+    src, dst = simple_pairs(src, dst)
+    n = len(names)
+
+    if specific_vertex is None:
+        kept, src, dst = level_of_detail(n, src, dst, max_vertices, max_edges, seed)
+        positions = force_layout(len(kept), src, dst, iterations, seed)
+        highlight = None
+    elif specific_vertex in graph.vertices:
+        kept, src, dst = ego_network(n, src, dst, names.index(specific_vertex), radius)
+        # the centre stays put in the middle, the rest start on a circle around it
+        angles = np.linspace(0, 2 * np.pi, len(kept) - 1, endpoint=False)
+        start = np.concatenate([[[0.5, 0.5]], 0.5 + 0.4 * np.stack([np.cos(angles), np.sin(angles)], axis=1)])
+        positions = force_layout(len(kept), src, dst, iterations, seed, positions=start, fixed=[0])
+        highlight = [0]
+    else:
+        print(f"Vertex {specific_vertex} does not exist")
+        return {}
+
+    labels = [names[i] for i in kept.tolist()]
+    render(labels, positions, src, dst, highlight=highlight)
+    if show:
+        plt.show()
+    return dict(zip(labels, map(tuple, positions.tolist())))
+
+
+if __name__ == "__main__":
+    from timeit import default_timer
+    import matplotlib.pyplot as plt
+    from laborator1 import Graph, read_from_file
+
+    graph = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    names, src, dst = arc_arrays(graph)
+    src, dst = simple_pairs(src, dst)
+    n = len(names)
+
+    begin = default_timer()
+    positions = force_layout(n, src, dst)
+    print(f"facebook layout, {n} vertices and {len(src)} edges, 50 iterations: {default_timer() - begin:.2f}s")
+
+    # the grid repulsion against the exact all pairs sum on the final layout
+    k = np.sqrt(1.0 / n)
+    delta = positions[:, None, :] - positions[None, :, :]
+    distances = (delta ** 2).sum(axis=2)
+    distances[distances == 0] = np.inf
+    exact = (delta * (k * k / distances)[:, :, None]).sum(axis=1)
+    error = np.hypot(*(_repulsion(positions, k) - exact).T) / np.hypot(*exact.T)
+    print(f"grid repulsion relative error: median {np.median(error):.4f}, 95th percentile "
+          f"{np.percentile(error, 95):.4f}")
+
+    begin = default_timer()
+    render(names, positions, src, dst)
+    plt.gcf().canvas.draw()
+    print(f"render: {default_timer() - begin:.2f}s")
+    plt.close("all")
+
+    begin = default_timer()
+    drawn = draw_graph(graph, specific_vertex=107, show=False)
+    print(f"ego view of 107, {len(drawn)} vertices: {default_timer() - begin:.2f}s")
+    plt.close("all")
+
+    draw_graph(graph)
@@ -0,0 +1,150 @@
+from multiprocessing import cpu_count
+import numpy as np
+from laborator1 import CSRGraph
+from shared import attached, release, share_arrays
+import executor
+
+WORD = 64
+
+
+def _or_rows(indptr, indices, words, rows=None):
+    # OR of words[indices] over every CSR row (or only the given rows), 0 for empty rows
+    if rows is None:
+        starts, ends = indptr[:-1], indptr[1:]
+        gathered = words[indices]
+    else:
+        starts, ends = indptr[rows], indptr[rows + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        gathered = words[indices[positions]]
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+    result = np.zeros(len(starts), dtype=np.uint64)
+    nonempty = ends > starts
+    if len(gathered):
+        result[nonempty] = np.bitwise_or.reduceat(gathered, starts[nonempty])
+    return result
+
+
+def bfs_block(in_indptr, in_indices, sources):
+    # hop distances from up to 64 sources at once, distances[i, v] = -1 when v is unreachable from sources[i].
+    # Bit i of seen[v] / frontier[v] says source i has reached v / reached it on the last level, so one level
+    # of all the searches is a single OR over the in-neighbours of every vertex
+    n = len(in_indptr) - 1
+    k = len(sources)
+    distances = np.full((k, n), -1, dtype=np.int32)
+    bits = np.left_shift(np.uint64(1), np.arange(k, dtype=np.uint64))
+
+    frontier = np.zeros(n, dtype=np.uint64)
+    np.bitwise_or.at(frontier, sources, bits)
+    seen = frontier.copy()
+    distances[np.arange(k), sources] = 0
+    full = np.bitwise_or.reduce(bits)
+    pending = np.arange(n)
+
+    level = 0
+    while len(pending):
+        level += 1
+        # only vertices some search has not reached yet can change
+        pending = pending[seen[pending] != full]
+        found = _or_rows(in_indptr, in_indices, frontier, pending if len(pending) < n else None) & ~seen[pending]
+
+        changed = found != 0
+        if not changed.any():
+            break
+        vertices, found = pending[changed], found[changed]
+        frontier = np.zeros(n, dtype=np.uint64)
+        frontier[vertices] = found
+        seen[vertices] |= found
+
+        # (vertex, source) pairs of the newly reached bits
+        unpacked = np.unpackbits(found.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        rows, columns = np.nonzero(unpacked[:, :k])
+        distances[columns, vertices[rows]] = level
+
+    return distances
+
+
+def _bfs_block(specs, sources):
+    csr = attached(specs)
+    return sources, bfs_block(csr["in_indptr"], csr["in_indices"], sources)
+
+
+def multi_source_bfs(graph, sources=None, no_processes=1):
+    # streams (source, distances to every vertex) for sources (all vertices by default), 64 searches at a time;
+    # distances are in graph.get_vertices() order of the CSR form, -1 for unreachable vertices
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph(graph=graph)
+    names = csr.get_vertices()
+    if sources is None:
+        ids = np.arange(len(names))
+    else:
+        ids = [csr._id(source) for source in sources]
+        if None in ids:
+            raise ValueError(f"Vertex {sources[ids.index(None)]} not found in the graph.")
+        ids = np.array(ids, dtype=np.int64)
+    batches = [ids[i:i + WORD] for i in range(0, len(ids), WORD)]
+
+    if no_processes == 1:
+        for batch in batches:
+            distances = bfs_block(csr.in_indptr, csr.in_indices, batch)
+            for i, source in enumerate(batch.tolist()):
+                yield names[source], distances[i]
+        return
+
+    blocks = []
+    try:
+        _, specs = share_arrays({"in_indptr": csr.in_indptr, "in_indices": csr.in_indices}, blocks)
+        # a batch is already ~64 searches of work, one task each
+        for batch, distances in executor.imap(_bfs_block, [(specs, batch) for batch in batches], no_processes,
+                                              chunksize=1, star=True):
+            for i, source in enumerate(batch.tolist()):
+                yield names[source], distances[i]
+    finally:
+        release(blocks)
+
+
+def distance_matrix(graph, sources=None, no_processes=1):
+    # (source names, distance matrix with one row per source), columns in CSRGraph vertex order
+    rows = list(multi_source_bfs(graph, sources, no_processes))
+    return [source for source, _ in rows], np.array([distances for _, distances in rows], dtype=np.int32)
+
+
+if __name__ == "__main__":
+    from timeit import default_timer
+    import networkx as nx
+    from laborator1 import Graph, bfs, read_from_file
+    from query_cache import bfs_tree
+
+    graph = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    csr = CSRGraph(graph=graph)
+    names = csr.get_vertices()
+
+    begin = default_timer()
+    for source in names[:20]:
+        bfs(graph, source)
+    serial = 20 / (default_timer() - begin)
+    begin = default_timer()
+    for source in names[:100]:
+        bfs_tree(graph, source)
+    print(f"bfs per source: {serial:.1f} sources/s, deque bfs_tree per source: "
+          f"{100 / (default_timer() - begin):.1f} sources/s")
+
+    for no_processes in sorted({1, cpu_count()}):
+        begin = default_timer()
+        eccentricity = {}
+        closeness = {}
+        for source, distances in multi_source_bfs(csr, no_processes=no_processes):
+            reached = distances[distances > 0]
+            eccentricity[source] = int(reached.max()) if len(reached) else 0
+            closeness[source] = len(reached) / reached.sum() if len(reached) else 0.0
+        elapsed = default_timer() - begin
+        print(f"multi_source_bfs, {no_processes} processes: {len(names) / elapsed:.1f} sources/s, "
+              f"all {len(names)} sources in {elapsed:.2f}s, diameter {max(eccentricity.values())}")
+
+    reference = nx.Graph([edge[:2] for edge in graph.get_edges()])
+    sources, matrix = distance_matrix(csr, names[::97])
+    for source, row in zip(sources, matrix):
+        expected = nx.single_source_shortest_path_length(reference, source)
+        assert all(row[i] == expected.get(name, -1) for i, name in enumerate(names))
+    print(f"distance rows of {len(sources)} sources match networkx")
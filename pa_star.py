@@ -1,5 +1,8 @@
 import heapq
-from multiprocessing import Pool, cpu_count
+import queue
+from multiprocessing import Array, Lock, Process, Queue, Value, cpu_count
+import numpy as np
+from shared import attach_arrays, release, share_arrays
 
 class Graph:
     def __init__(self):
@@ -16,50 +19,144 @@ class Graph:
         self.vertices[u][v] = weight
         self.vertices[v][u] = weight
 
-def process_neighbor(args):
-    neighbor, current, graph, g_score, f_score, came_from = args
-    tentative_g_score = g_score[current] + graph.vertices[current][neighbor]
-
-    if tentative_g_score < g_score[neighbor]:
-        came_from[neighbor] = current
-        g_score[neighbor] = tentative_g_score
-        f_score[neighbor] = tentative_g_score + graph.vertices[neighbor]['heuristic']
-
-        return (f_score[neighbor], neighbor)
-
-    return None
-
-def astar(graph, start, goal):
-    open_set = [(0, start)]  # Priority queue of nodes to be evaluated
-    came_from = {}  # Dictionary to store the parent node of each node
-    g_score = {vertex: float('inf') for vertex in graph.vertices}  # Cost from start along best known path
-    g_score[start] = 0
-    f_score = {vertex: float('inf') for vertex in graph.vertices}  # Estimated total cost from start to goal through y
-    f_score[start] = graph.vertices[start]['heuristic']
-
-    pool = Pool(cpu_count())
-
-    while open_set:
-        _, current = heapq.heappop(open_set)
-
-        if current == goal:
-            # Reconstruct the path from goal to start
-            path = [current]
-            while current in came_from:
-                current = came_from[current]
-                path.append(current)
-            path.reverse()
-            return path
-
-        neighbors = list(graph.vertices[current].keys())
-        args_list = [(neighbor, current, graph, g_score, f_score, came_from) for neighbor in neighbors if neighbor != 'heuristic']
-        results = pool.map(process_neighbor, args_list)
-
-        for result in results:
-            if result is not None:
-                heapq.heappush(open_set, result)
-
-    return None  # No path found
+def to_arrays(graph):
+    # CSR view of graph.vertices: names are numbered in insertion order
+    names = list(graph.vertices)
+    ids = {name: i for i, name in enumerate(names)}
+    indptr = [0]
+    indices = []
+    weights = []
+    for name in names:
+        for neighbor, weight in graph.vertices[name].items():
+            if neighbor != 'heuristic':
+                indices.append(ids[neighbor])
+                weights.append(weight)
+        indptr.append(len(indices))
+
+    heuristic = [graph.vertices[name]['heuristic'] for name in names]
+    return names, ids, {"indptr": np.array(indptr, dtype=np.int64), "indices": np.array(indices, dtype=np.int64),
+                        "weights": np.array(weights, dtype=np.float64), "heuristic": np.array(heuristic, dtype=np.float64),
+                        "parent": np.full(len(names), -1, dtype=np.int64)}
+
+def hda_worker(rank, no_workers, specs, inboxes, start, goal, incumbent, lock, counters, idle, done, batch_size=64):
+    # Hash distributed A*: this worker owns the nodes with id % no_workers == rank and keeps their open list,
+    # best g and parent; relaxations of nodes owned by other workers are sent to their inbox in batches
+    blocks, arrays = attach_arrays(specs)
+    indptr, indices = arrays["indptr"].tolist(), arrays["indices"].tolist()
+    weights, heuristic = arrays["weights"].tolist(), arrays["heuristic"].tolist()
+    parent = arrays["parent"]
+
+    g_score = {}
+    open_set = []
+    expanded = 0
+
+    def relax(node, g, frm):
+        if g < g_score.get(node, float('inf')) and g + heuristic[node] < incumbent.value:
+            g_score[node] = g
+            parent[node] = frm
+            heapq.heappush(open_set, (g + heuristic[node], g, node))
+
+    if start % no_workers == rank:
+        relax(start, 0.0, -1)
+
+    while not done.value:
+        while True:
+            try:
+                batch = inboxes[rank].get_nowait()
+            except queue.Empty:
+                break
+            with lock:
+                idle[rank] = 0
+                counters[1] += 1
+            for message in batch:
+                relax(*message)
+
+        outboxes = [[] for _ in range(no_workers)]
+        steps = 0
+        while open_set and steps < batch_size:
+            f, g, current = heapq.heappop(open_set)
+            # stale entry, or it cannot beat the best path to goal found so far
+            if g > g_score[current] or f >= incumbent.value:
+                continue
+
+            if current == goal:
+                with lock:
+                    if g < incumbent.value:
+                        incumbent.value = g
+                continue
+
+            expanded += 1
+            steps += 1
+            for i in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[i]
+                owner = neighbor % no_workers
+                if owner == rank:
+                    relax(neighbor, g + weights[i], current)
+                else:
+                    outboxes[owner].append((neighbor, g + weights[i], current))
+
+        for owner, outbox in enumerate(outboxes):
+            if outbox:
+                with lock:
+                    counters[0] += 1
+                inboxes[owner].put(outbox)
+
+        if not open_set:
+            with lock:
+                idle[rank] = 1
+                if all(idle) and counters[0] == counters[1]:
+                    done.value = 1
+            if not done.value:
+                try:
+                    batch = inboxes[rank].get(timeout=0.01)
+                except queue.Empty:
+                    continue
+                with lock:
+                    idle[rank] = 0
+                    counters[1] += 1
+                for message in batch:
+                    relax(*message)
+
+    with lock:
+        counters[2] += expanded
+    for block in blocks:
+        block.close()
+
+def astar(graph, start, goal, no_processes=None):
+    no_processes = no_processes or cpu_count()
+    names, ids, arrays = to_arrays(graph)
+    blocks = []
+
+    try:
+        arrays, specs = share_arrays(arrays, blocks)
+        inboxes = [Queue() for _ in range(no_processes)]
+        incumbent = Value('d', float('inf'), lock=False)
+        counters = Array('q', 3, lock=False)  # batches sent, batches received, nodes expanded
+        idle = Array('b', no_processes, lock=False)
+        done = Value('b', 0, lock=False)
+        lock = Lock()
+
+        processes = [Process(target=hda_worker, args=(rank, no_processes, specs, inboxes, ids[start], ids[goal],
+                                                      incumbent, lock, counters, idle, done))
+                     for rank in range(no_processes)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        if incumbent.value == float('inf'):
+            return None, float('inf'), counters[2]
+
+        # Reconstruct the path from goal to start, every owner wrote the parent of its nodes
+        parent = arrays["parent"]
+        path = [ids[goal]]
+        while path[-1] != ids[start] and len(path) <= len(names):
+            path.append(int(parent[path[-1]]))
+        path.reverse()
+        return [names[node] for node in path], incumbent.value, counters[2]
+
+    finally:
+        release(blocks)
 
 
 if __name__ == '__main__':
@@ -83,10 +180,24 @@ if __name__ == '__main__':
 
     start_node = 'A'
     goal_node = 'F'
-    path = astar(g, start_node, goal_node)
+    path, cost, expanded = astar(g, start_node, goal_node)
     if path:
-        print(f"Shortest path from {start_node} to {goal_node}: {' -> '.join(path)}")
+        print(f"Shortest path from {start_node} to {goal_node}: {' -> '.join(path)} (cost {cost}, {expanded} expanded)")
     else:
         print(f"No path found from {start_node} to {goal_node}.")
 
-
+    # Speedup against the number of workers on a large grid
+    from timeit import default_timer
+    import a_star
+
+    size = 300
+    grid = a_star.grid_graph(size, size, (size - 1, size - 1))
+    begin = default_timer()
+    _, serial_cost, _ = a_star.astar(grid, (0, 0), (size - 1, size - 1))
+    serial_time = default_timer() - begin
+    print(f"serial a_star.astar: cost {serial_cost}, {serial_time:.3f}s")
+    for workers in sorted({1, 2, 4, cpu_count()}):
+        begin = default_timer()
+        _, cost, expanded = astar(grid, (0, 0), (size - 1, size - 1), no_processes=workers)
+        elapsed = default_timer() - begin
+        print(f"{workers} workers: cost {cost}, {expanded} expanded, {elapsed:.3f}s, speedup {serial_time / elapsed:.2f}x")
@@ -1,6 +1,5 @@
-from multiprocessing import Pool
-from multiprocessing import Process
-from multiprocessing import Manager
+from multiprocessing import Process, Queue, cpu_count
+import executor
 
 
 def task(x):
@@ -11,30 +10,34 @@ def task_m(x, id, m_d):
     m_d[id] = x ** 2
 
 
-def solve_with_processes(numbers):
+def task_slice(numbers, start, results):
+    results.put((start, [task(x) for x in numbers]))
 
-    processes = list()
-    manager = Manager()
-    m_d = manager.dict()
 
-    for id, x in enumerate(numbers):
-        p = Process(target=task_m, args=(x, id, m_d))
-        processes.append(p)
-    
+def solve_with_processes(numbers, no_processes=None):
+    # one process per slice of the numbers instead of one per number, results sent back through a queue
+    if not numbers:
+        return []
+    no_processes = max(1, min(no_processes or cpu_count(), len(numbers)))
+    step = -(-len(numbers) // no_processes)
+    results = Queue()
+    processes = [Process(target=task_slice, args=(numbers[start:start + step], start, results))
+                 for start in range(0, len(numbers), step)]
+
     for p in processes:
         p.start()
-    
+
+    # the queue is drained before the joins, a process only exits once its results are out of the pipe
+    squares = dict(results.get() for _ in processes)
+
     for p in processes:
         p.join()
 
-    return [m_d[key] for key in m_d]
+    return [x for start in sorted(squares) for x in squares[start]]
 
 
 def solve_with_pool(numbers):
-    with Pool(12) as p:
-        result = p.map(task, numbers)
-
-    return result
+    return executor.map(task, numbers)
 
 
 def main():
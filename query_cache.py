@@ -0,0 +1,180 @@
+import sys
+import weakref
+from collections import OrderedDict, deque
+from a_star import astar
+from laborator1 import bfs, dfs
+
+
+def estimate_size(value, seen=None):
+    # rough deep size of a query result: containers are followed, shared objects are counted once
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+
+    return size
+
+
+def bfs_tree(graph, source):
+    # level and parent of every vertex reachable from source, in the same visiting order as bfs
+    levels = {source: 0}
+    parents = {source: None}
+    queue = deque([source])
+
+    while queue:
+        vertex = queue.popleft()
+        for node in graph.get_out_neighbours(vertex):
+            if node not in levels:
+                levels[node] = levels[vertex] + 1
+                parents[node] = vertex
+                queue.append(node)
+
+    return levels, parents
+
+
+class QueryCache:
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (algorithm, id(graph), graph version, params) -> (weak reference to graph, result, size), in LRU order
+        self.entries = OrderedDict()
+        # graph -> version its entries were computed at; weak, so collected graphs leave and a new graph reusing
+        # their id starts afresh
+        self.versions = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def query(self, algorithm, graph, params, compute):
+        # graphs without a version counter (CSRGraph) are immutable, so every result for them stays valid
+        version = getattr(graph, 'version', 0)
+        if graph not in self.versions:
+            # its results go with it, not when the LRU order reaches them
+            weakref.finalize(graph, self._drop, id(graph))
+        elif self.versions[graph] != version:
+            self.invalidate(graph)
+        self.versions[graph] = version
+
+        key = (algorithm, id(graph), version, params)
+        entry = self.entries.get(key)
+        # the reference guards against a new graph reusing the id of a collected one
+        if entry is not None and entry[0]() is graph:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        result = compute()
+        self.store(key, graph, result)
+        return result
+
+    def store(self, key, graph, result):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[2]
+
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = (weakref.ref(graph), result, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self.bytes -= self.entries.popitem(last=False)[1][2]
+            self.evictions += 1
+
+    def _drop(self, graph_id=None):
+        for key in [key for key in self.entries if graph_id is None or key[1] == graph_id]:
+            self.bytes -= self.entries.pop(key)[2]
+
+    def invalidate(self, graph=None):
+        # drops every result of graph, or everything; mutators make results stale through the version instead
+        if graph is None:
+            self._drop()
+            self.versions.clear()
+        else:
+            # its version stays, with the finalizer registered for it
+            self._drop(id(graph))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.bytes}
+
+    # cached results are shared between callers, so they must not be modified in place
+
+    def bfs(self, graph, start_node):
+        return self.query("bfs", graph, (start_node,), lambda: bfs(graph, start_node))
+
+    def dfs(self, graph, vertex):
+        return self.query("dfs", graph, (vertex,), lambda: dfs(graph, vertex))
+
+    def astar(self, graph, start, goal, heuristic=None):
+        return self.query("astar", graph, (start, goal, heuristic), lambda: astar(graph, start, goal, heuristic))
+
+    def bfs_tree(self, graph, source):
+        return self.query("bfs_tree", graph, (source,), lambda: bfs_tree(graph, source))
+
+    def distance(self, graph, source, target):
+        # number of edges on a shortest path, answered from the cached bfs tree of source; None if unreachable
+        return self.bfs_tree(graph, source)[0].get(target)
+
+    def path(self, graph, source, target):
+        levels, parents = self.bfs_tree(graph, source)
+        if target not in levels:
+            return None
+
+        path = [target]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+
+default_cache = QueryCache()
+
+
+def cached_bfs(graph, start_node):
+    return default_cache.bfs(graph, start_node)
+
+
+def cached_dfs(graph, vertex):
+    return default_cache.dfs(graph, vertex)
+
+
+def cached_astar(graph, start, goal, heuristic=None):
+    return default_cache.astar(graph, start, goal, heuristic)
+
+
+if __name__ == "__main__":
+    import random
+    from timeit import default_timer
+    from laborator1 import Graph, read_from_file
+
+    graph = Graph(read_from_file('facebook_combined.txt'), directed=False, weighted=False)
+    rng = random.Random(0)
+    sources = rng.sample(list(graph.get_vertices()), 50)
+    cache = QueryCache(max_bytes=16 * 2 ** 20)
+
+    for label in ("cold", "warm"):
+        begin = default_timer()
+        for source in sources:
+            cache.bfs(graph, source)
+        elapsed = default_timer() - begin
+        print(f"{label}: {len(sources)} bfs queries in {elapsed:.3f}s")
+
+    graph.add_edge(sources[0], sources[1])
+    begin = default_timer()
+    cache.bfs(graph, sources[0])
+    print(f"after add_edge: {default_timer() - begin:.4f}s, stats {cache.stats()}")
+
+    queries = [tuple(rng.sample(sources[:20], 2)) for _ in range(10000)]
+    begin = default_timer()
+    total = sum(cache.distance(graph, s, t) or 0 for s, t in queries)
+    print(f"{len(queries)} distance queries from 20 cached bfs trees in {default_timer() - begin:.3f}s "
+          f"(total distance {total}), stats {cache.stats()}")
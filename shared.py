@@ -0,0 +1,324 @@
+from collections import OrderedDict
+from multiprocessing import Lock, Process, parent_process, shared_memory
+from multiprocessing.context import get_spawning_popen
+from multiprocessing.managers import BaseManager
+from timeit import default_timer
+import numpy as np
+
+# the locks every structure below stripes over. They are made on first use, not on import, so importing this
+# module does not fix the start method, and are handed to other processes explicitly rather than inherited,
+# which only forked children could do: in the pickled state of a structure passed to Process, or by
+# install_locks as a Pool initializer, as executor does
+STRIPES = 64
+_locks = None
+_next_stripe = 0
+
+
+def get_locks():
+    global _locks
+    if _locks is None:
+        _locks = [Lock() for _ in range(STRIPES)]
+    return _locks
+
+
+def install_locks(locks):
+    # Pool initializer: the workers use the locks of the process that started them
+    global _locks
+    _locks = locks
+
+
+def share_arrays(arrays, blocks):
+    # copies of arrays in new shared memory blocks, appended to blocks: (views, specs to attach them by)
+    views, specs = {}, {}
+    for key, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        views[key] = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        views[key][:] = array
+        specs[key] = (block.name, array.dtype.str, array.shape)
+    return views, specs
+
+
+def attach_arrays(specs):
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs.values()]
+    views = {key: np.ndarray(shape, dtype=dtype, buffer=block.buf)
+             for (key, (_, dtype, shape)), block in zip(specs.items(), blocks)}
+    return blocks, views
+
+
+def release(blocks):
+    # the owner's side: unmaps and removes the blocks share_arrays made
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# worker side: shared arrays by the names of their blocks, a few callers' worth kept attached between tasks
+_attached = OrderedDict()
+ATTACHED = 16
+
+
+def attached(specs):
+    # {key: array view} of the arrays share_arrays described with specs
+    key = tuple(name for name, _, _ in specs.values())
+    if key in _attached:
+        _attached.move_to_end(key)
+    else:
+        while len(_attached) >= ATTACHED:
+            blocks, views = _attached.popitem(last=False)[1]
+            views.clear()
+            for block in blocks:
+                block.close()
+        _attached[key] = attach_arrays(specs)
+    return _attached[key][1]
+
+
+def _stripes(count):
+    # the first of count consecutive stripes, handed out round robin so separate structures rarely start on
+    # the same lock
+    global _next_stripe
+    first = _next_stripe
+    _next_stripe = (_next_stripe + count) % STRIPES
+    return first
+
+
+class SharedArray:
+    # a NumPy array in a shared memory block. It pickles as the block's spec, so it can be passed to Process
+    # or executor tasks; the creating process owns the block and removes it on close()
+
+    def __init__(self, shape, dtype=np.int64, fill=0):
+        dtype = np.dtype(dtype)
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self.block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self.spec = (self.block.name, dtype.str, shape)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.block.buf)
+        self.array[...] = fill
+        self.locks = get_locks()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["block"], state["array"], state["locks"]
+        # locks only pickle while a process is being started; a pool task finds them installed in the worker
+        if get_spawning_popen() is not None:
+            state["locks"] = self.locks
+        return state
+
+    def __setstate__(self, state):
+        locks = state.pop("locks", None)
+        if locks is None:
+            # a worker that was handed no locks would make private ones and lock nothing; _lock() refuses then
+            locks = _locks if parent_process() is not None else get_locks()
+        elif _locks is None:
+            install_locks(locks)
+        self.__dict__.update(state)
+        self.locks = locks
+        self.block = None
+        self.array = attached({"array": self.spec})["array"]
+
+    def _lock(self, stripe):
+        if self.locks is None:
+            raise RuntimeError("This process has no shared locks; start pools with executor.get_pool or pass the "
+                               "structure to Process.")
+        return self.locks[stripe]
+
+    def close(self):
+        if self.block is not None:
+            self.array = None
+            release([self.block])
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StripedArray(SharedArray):
+    # element i is guarded by lock (first + i) % STRIPES, so writers to different parts of the array do not
+    # wait for each other; the bulk updates take every stripe they touch once, in stripe order
+
+    def __init__(self, shape, dtype=np.int64, fill=0):
+        super().__init__(shape, dtype, fill)
+        self.first = _stripes(1)
+
+    def _groups(self, indices):
+        # (lock, positions into indices) of every stripe indices touch
+        stripe = (np.asarray(indices) + self.first) % STRIPES
+        order = np.argsort(stripe, kind="stable")
+        bounds = np.flatnonzero(np.diff(stripe[order])) + 1
+        for positions in np.split(order, bounds) if len(order) else []:
+            yield self._lock(stripe[positions[0]]), positions
+
+    def add(self, indices, values=1):
+        indices = np.asarray(indices)
+        values = np.broadcast_to(values, indices.shape)
+        for lock, positions in self._groups(indices):
+            with lock:
+                np.add.at(self.array, indices[positions], values[positions])
+
+    def minimum(self, indices, values):
+        # array[i] = min(array[i], value) for every pair, as if one at a time
+        indices = np.asarray(indices)
+        values = np.broadcast_to(values, indices.shape)
+        for lock, positions in self._groups(indices):
+            with lock:
+                np.minimum.at(self.array, indices[positions], values[positions])
+
+    def claim(self, indices):
+        # test and set: sets the zero elements among indices to 1 and returns the indices this call set
+        indices = np.unique(np.asarray(indices))
+        claimed = []
+        for lock, positions in self._groups(indices):
+            with lock:
+                free = indices[positions][self.array[indices[positions]] == 0]
+                self.array[free] = 1
+            claimed.append(free)
+        return np.sort(np.concatenate(claimed)) if claimed else indices[:0]
+
+
+class Counter(SharedArray):
+    # a shared integer; add() is atomic, value reads without taking the lock
+
+    def __init__(self, value=0):
+        super().__init__(1, np.int64, value)
+        self.stripe = _stripes(1)
+
+    def add(self, amount=1):
+        with self._lock(self.stripe):
+            self.array[0] += amount
+            return int(self.array[0])
+
+    @property
+    def value(self):
+        return int(self.array[0])
+
+
+class ShardedAccumulator(SharedArray):
+    # one row per shard: whoever owns shard i adds to row i without a lock, reduce() sums the rows at the end
+
+    def __init__(self, shards, shape=(), dtype=np.int64):
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        super().__init__((shards,) + shape, dtype)
+
+    def shard(self, i):
+        # a view even for scalar shards, so shard(i) += value writes through
+        return self.array[i, ...]
+
+    def add(self, i, value=1):
+        self.array[i] += value
+
+    def reduce(self):
+        return self.array.sum(axis=0)
+
+
+# the benchmark's workers, at module level so spawned processes can unpickle them
+
+
+class _Coco:
+    # the value object the Manager baseline proxies
+    def __init__(self, x):
+        self.x = x
+
+    def get_x(self):
+        return self.x
+
+    def set_x(self, x):
+        self.x = x
+
+
+class _CocoManager(BaseManager):
+    pass
+
+
+def _proxy_worker(coco, lock, count):
+    for _ in range(count):
+        with lock:
+            coco.set_x(coco.get_x() + 1)
+
+
+def _value_worker(value, count):
+    for _ in range(count):
+        with value.get_lock():
+            value.value += 1
+
+
+def _counter_worker(counter, count):
+    for _ in range(count):
+        counter.add()
+
+
+def _sharded_worker(accumulator, rank, count):
+    shard = accumulator.shard(rank)
+    for _ in range(count):
+        shard += 1
+
+
+def _list_proxy_worker(proxy, lock, indices):
+    for i in indices.tolist():
+        with lock:
+            proxy[i] += 1
+
+
+def _striped_worker(array, indices):
+    for batch in np.array_split(indices, 100):
+        array.add(batch)
+
+
+def _run(target, args_of_rank, no_processes=4):
+    processes = [Process(target=target, args=args_of_rank(rank)) for rank in range(no_processes)]
+    begin = default_timer()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return default_timer() - begin
+
+
+if __name__ == "__main__":
+    import sys
+    from multiprocessing import Manager, Value, set_start_method
+
+    # python shared.py spawn checks the structures under the start method Windows and macOS use
+    if len(sys.argv) > 1:
+        set_start_method(sys.argv[1])
+    _CocoManager.register("Coco", _Coco)
+
+    no_processes = 4
+    count = 2000
+    total = no_processes * count
+    with _CocoManager() as manager:
+        coco, lock = manager.Coco(0), Lock()
+        elapsed = _run(_proxy_worker, lambda rank: (coco, lock, count))
+        assert coco.get_x() == total
+        print(f"Manager proxied Coco + Lock: {total / elapsed:,.0f} increments/s")
+
+    value = Value("q", 0)
+    elapsed = _run(_value_worker, lambda rank: (value, 100 * count))
+    assert value.value == 100 * total
+    print(f"multiprocessing.Value: {100 * total / elapsed:,.0f} increments/s")
+
+    with Counter() as counter:
+        elapsed = _run(_counter_worker, lambda rank: (counter, 100 * count))
+        assert counter.value == 100 * total
+        print(f"Counter: {100 * total / elapsed:,.0f} increments/s")
+
+    with ShardedAccumulator(no_processes) as accumulator:
+        elapsed = _run(_sharded_worker, lambda rank: (accumulator, rank, 1000 * count))
+        assert accumulator.reduce() == 1000 * total
+        print(f"ShardedAccumulator: {1000 * total / elapsed:,.0f} increments/s")
+
+    n = 100000
+    rng = np.random.default_rng(0)
+    indices = [rng.integers(0, n, count) for _ in range(no_processes)]
+    with Manager() as manager:
+        proxy, lock = manager.list([0] * n), Lock()
+        elapsed = _run(_list_proxy_worker, lambda rank: (proxy, lock, indices[rank]))
+        assert sum(proxy) == total
+        print(f"Manager list proxy + Lock: {total / elapsed:,.0f} element updates/s")
+
+    indices = [rng.integers(0, n, 1000 * count) for _ in range(no_processes)]
+    with StripedArray(n) as array:
+        elapsed = _run(_striped_worker, lambda rank: (array, indices[rank]))
+        assert array.array.sum() == 1000 * total
+        print(f"StripedArray, batches of {1000 * count // 100}: {1000 * total / elapsed:,.0f} element updates/s")
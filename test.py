@@ -12,40 +12,22 @@ b = [a for _ in a]
 a[0] = 2
 
 
-class Coco():
-    def __init__(self, x) -> None:
-        self.x = x
+from multiprocessing import Process
+from shared import Counter
 
-    def get_x(self):
-        return self.x
 
-    def set_x(self, x):
-        self.x = x
-
-from multiprocessing import Process, Lock
-from multiprocessing.managers import BaseManager
-
-class CustomManager(BaseManager):
-    pass
-
-
-def worker(shared_coco:Coco, lock:Lock):
+def worker(shared_coco:Counter):
+    # the increment happens in shared memory under the counter's own lock, no manager round trips
     for _ in range(10):
-        with lock:
-            shared_coco.set_x(shared_coco.get_x() + 1)
+        shared_coco.add(1)
 
 
 def main():
-    CustomManager.register("Coco", Coco)
-
-    with CustomManager() as m_d:
-
-        shared_coco = m_d.Coco(0)
-        lock = Lock()
+    with Counter(0) as shared_coco:
 
         processes = list()
         for _ in range(10):
-            processes.append(Process(target=worker, args=(shared_coco, lock)))
+            processes.append(Process(target=worker, args=(shared_coco,)))
         
         for p in processes:
             p.start()
@@ -54,7 +36,7 @@ def main():
             p.join()
 
         print("CEAPA")
-        print(shared_coco.get_x())
+        print(shared_coco.value)
 
 
 if __name__ == "__main__":